@@ -11,25 +11,27 @@ import os
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from core import (
-    extract_frames,
-    batch_resize,
-    generate_image_adofai,
-    generate_video_adofai,
-    generate_video_adofai_v2
-)
-from utils import natural_sort_key, find_image_files
-from config import DEFAULT_FPS, DEFAULT_ZOOM, DEFAULT_Y_OFFSET
+# core中的功能依赖 cv2/PIL，在各子命令中按需导入，保证 --help 等操作快速启动
+from utils import natural_sort_key, iglob_files
+from config import DEFAULT_FPS, DEFAULT_ZOOM, DEFAULT_Y_OFFSET, DEFAULT_PNG_COMPRESSION
 
 
 def cmd_extract_frames(args):
     """视频提取帧命令"""
+    from core import extract_frames
+    
     result = extract_frames(
         video_path=args.video,
         output_base_dir=args.output,
         image_format=args.format,
         group_size=args.group,
-        verbose=True
+        verbose=True,
+        decoder=args.decoder,
+        compression=args.compression,
+        num_workers=args.workers,
+        hw_accel=not args.no_hwaccel,
+        frame_step=args.step,
+        encoder=args.encoder
     )
     if not result['success']:
         print(f"❌ 错误: {result['error']}")
@@ -38,6 +40,8 @@ def cmd_extract_frames(args):
 
 def cmd_resize(args):
     """批量缩放图片命令"""
+    from core import batch_resize
+    
     # 确定模式
     if args.width:
         mode, w, h, p = 'width', args.width, 0, 0
@@ -60,7 +64,15 @@ def cmd_resize(args):
             height=h,
             percent=p,
             group_mode=not args.no_group,
-            verbose=True
+            verbose=True,
+            jobs=args.jobs,
+            png_level=args.png_level,
+            progressive=args.progressive,
+            backend=args.backend,
+            threads=args.threads,
+            skip_existing=args.skip_existing,
+            palette=args.palette,
+            optimize=args.optimize
         )
         if result['fail'] > 0:
             sys.exit(1)
@@ -71,11 +83,14 @@ def cmd_resize(args):
 
 def cmd_image2adofai(args):
     """图片转ADOFAI命令"""
+    from core import generate_image_adofai
+    
     try:
         success = generate_image_adofai(
             image_path=args.image,
             output_path=args.output,
-            y_offset=args.y_offset
+            y_offset=args.y_offset,
+            include_alpha=not args.no_alpha
         )
         if not success:
             sys.exit(1)
@@ -86,18 +101,17 @@ def cmd_image2adofai(args):
 
 def cmd_video2adofai(args):
     """视频帧转ADOFAI命令"""
-    import glob
-    
-    # 处理通配符
-    frame_paths = []
-    for pattern in args.frames:
-        if '*' in pattern or '?' in pattern:
-            matched = glob.glob(pattern)
-            frame_paths.extend(sorted(matched, key=natural_sort_key))
-        else:
-            frame_paths.append(pattern)
+    from itertools import chain
+    from core import generate_video_adofai, generate_video_adofai_v2
     
-    frame_paths = sorted(frame_paths, key=natural_sort_key)
+    # 处理通配符（惰性展开后只做一次自然排序，每个路径只计算一次排序key）
+    frame_paths = sorted(
+        chain.from_iterable(
+            iglob_files(pattern) if '*' in pattern or '?' in pattern else (pattern,)
+            for pattern in args.frames
+        ),
+        key=natural_sort_key
+    )
     
     if not frame_paths:
         print("错误: 没有找到任何帧图片文件")
@@ -106,10 +120,35 @@ def cmd_video2adofai(args):
     print(f"找到 {len(frame_paths)} 个帧文件")
     
     if args.v2:
-        success = generate_video_adofai_v2(frame_paths, args.output, args.fps, args.zoom)
+        success = generate_video_adofai_v2(frame_paths, args.output, args.fps, args.zoom,
+                                           skip_unchanged=not args.full_recolor,
+                                           merge_runs=not args.full_recolor,
+                                           include_alpha=args.alpha,
+                                           workers=args.workers)
     else:
-        success = generate_video_adofai(frame_paths, args.output, args.fps, args.zoom)
+        success = generate_video_adofai(frame_paths, args.output, args.fps, args.zoom,
+                                        include_alpha=args.alpha,
+                                        skip_repeated=not args.full_recolor,
+                                        workers=args.workers)
+    
+    if not success:
+        sys.exit(1)
+
+
+def cmd_direct2adofai(args):
+    """视频文件直接转ADOFAI命令"""
+    from core import generate_video_adofai_from_video
     
+    success = generate_video_adofai_from_video(
+        video_path=args.video,
+        output_path=args.output,
+        fps=args.fps,
+        zoom=args.zoom,
+        size=tuple(args.size) if args.size else None,
+        skip_unchanged=not args.full_recolor,
+        merge_runs=not args.full_recolor,
+        include_alpha=args.alpha
+    )
     if not success:
         sys.exit(1)
 
@@ -134,6 +173,9 @@ def main():
 
   # 视频帧转ADOFAI (v2高效版)
   python cli.py video2adofai ./frames/*.png -o output.adofai --v2
+
+  # 视频文件直接转ADOFAI (v2，不生成中间帧图片)
+  python cli.py direct2adofai video.mp4 -o output.adofai --size 32 18
 """
     )
     
@@ -147,6 +189,18 @@ def main():
                                help='输出图片格式（默认png）')
     extract_parser.add_argument('-g', '--group', type=int, default=1000,
                                help='每组帧数（默认1000）')
+    extract_parser.add_argument('-c', '--compression', type=int, default=DEFAULT_PNG_COMPRESSION, choices=range(10),
+                               metavar='0-9', help=f'PNG压缩级别（默认{DEFAULT_PNG_COMPRESSION}）')
+    extract_parser.add_argument('-j', '--workers', type=int, default=1,
+                               help='并行解码进程数（默认1）')
+    extract_parser.add_argument('--no-hwaccel', action='store_true',
+                               help='禁用 opencv 硬件解码')
+    extract_parser.add_argument('--decoder', default='auto', choices=['auto', 'opencv', 'ffmpeg', 'pyav', 'cuda'],
+                               help='解码方式（默认auto，优先使用ffmpeg）')
+    extract_parser.add_argument('-s', '--step', type=int, default=1,
+                               help='每N帧取1帧（默认1）')
+    extract_parser.add_argument('--encoder', default='opencv', choices=['opencv', 'ffmpeg'],
+                               help='图片编码方式（默认opencv；ffmpeg时由ffmpeg直接解码并写出图片）')
     extract_parser.set_defaults(func=cmd_extract_frames)
     
     # resize 命令
@@ -163,6 +217,22 @@ def main():
     
     resize_parser.add_argument('--no-group', action='store_true',
                               help='非分组模式')
+    resize_parser.add_argument('-j', '--jobs', type=int, default=None,
+                              help='并行进程数（默认CPU核心数）')
+    resize_parser.add_argument('--png-level', type=int, default=6, choices=range(10), metavar='0-9',
+                              help='PNG压缩级别（默认6）')
+    resize_parser.add_argument('--progressive', action='store_true',
+                              help='保存为渐进式JPEG')
+    resize_parser.add_argument('--backend', default='pil', choices=['pil', 'cv2'],
+                              help='缩放实现（默认pil，LANCZOS；cv2更快，缩小时使用INTER_AREA，画面比LANCZOS略柔和）')
+    resize_parser.add_argument('--threads', action='store_true',
+                              help='使用线程池并行（慢速/网络磁盘上可重叠读写与计算）')
+    resize_parser.add_argument('--skip-existing', action='store_true',
+                              help='跳过已存在、比源文件新且尺寸相同的输出文件（不比较格式/画质参数）')
+    resize_parser.add_argument('--palette', action='store_true',
+                              help='PNG输出量化为256色调色板（有损，文件更小）')
+    resize_parser.add_argument('--optimize', action='store_true',
+                              help='JPEG输出做霍夫曼表优化（体积略小，编码更慢）')
     resize_parser.set_defaults(func=cmd_resize)
     
     # image2adofai 命令
@@ -171,6 +241,8 @@ def main():
     img_parser.add_argument('-o', '--output', help='输出 .adofai 文件路径')
     img_parser.add_argument('-y', '--y-offset', type=float, default=DEFAULT_Y_OFFSET,
                            help=f'Y轴偏移量（默认{DEFAULT_Y_OFFSET}）')
+    img_parser.add_argument('--no-alpha', action='store_true',
+                           help='颜色不含alpha通道（输出6位rrggbb）')
     img_parser.set_defaults(func=cmd_image2adofai)
     
     # video2adofai 命令
@@ -183,8 +255,30 @@ def main():
                            help=f'缩放百分比（默认{DEFAULT_ZOOM}）')
     vid_parser.add_argument('--v2', action='store_true',
                            help='使用v2 RecolorTrack方案（更高效）')
+    vid_parser.add_argument('--alpha', action='store_true',
+                           help='颜色包含alpha通道（默认输出6位rrggbb）')
+    vid_parser.add_argument('--full-recolor', action='store_true',
+                           help='每个像素都生成颜色事件（默认v1省略与前一砖块同色的ColorTrack，v2跳过未变化的像素并合并同色区间）')
+    vid_parser.add_argument('-j', '--workers', type=int, default=1,
+                           help='生成事件的并行进程数（默认1，即单进程；多进程需显式指定，如 -j 4）')
     vid_parser.set_defaults(func=cmd_video2adofai)
     
+    # direct2adofai 命令
+    direct_parser = subparsers.add_parser('direct2adofai', help='视频文件直接转ADOFAI（v2）')
+    direct_parser.add_argument('video', help='输入视频文件路径')
+    direct_parser.add_argument('-o', '--output', required=True, help='输出 .adofai 文件路径')
+    direct_parser.add_argument('--fps', type=float,
+                              help='帧率（默认使用视频帧率）')
+    direct_parser.add_argument('--zoom', type=int, default=DEFAULT_ZOOM,
+                              help=f'缩放百分比（默认{DEFAULT_ZOOM}）')
+    direct_parser.add_argument('--size', nargs=2, type=int, metavar=('W', 'H'),
+                              help='缩放帧尺寸（默认保持视频原尺寸）')
+    direct_parser.add_argument('--alpha', action='store_true',
+                              help='颜色包含alpha通道（默认输出6位rrggbb）')
+    direct_parser.add_argument('--full-recolor', action='store_true',
+                              help='每帧为每个像素单独生成RecolorTrack（默认跳过未变化的像素并合并同色区间）')
+    direct_parser.set_defaults(func=cmd_direct2adofai)
+    
     args = parser.parse_args()
     
     if args.command is None:
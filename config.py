@@ -4,6 +4,8 @@
 ADOFAI 工具集 - 统一配置
 """
 
+from utils import format_value
+
 # ==================== 视频转ADOFAI配置 ====================
 
 # 帧渲染起始位置（相对于Director区）
@@ -24,6 +26,9 @@ DEFAULT_FPS = 5
 DEFAULT_ZOOM = 100
 DEFAULT_Y_OFFSET = 0.9
 
+# 写入.adofai文件时的缓冲区大小（字节），减少大量小块写入的系统调用
+WRITE_BUFFER_SIZE = 1 << 20
+
 # ==================== 图片处理配置 ====================
 
 # 支持的图片格式
@@ -32,8 +37,118 @@ SUPPORTED_IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.bmp']
 # 默认JPEG质量
 DEFAULT_JPEG_QUALITY = 95
 
+# 提取帧时的PNG压缩级别（0-9，中间帧文件更看重速度，默认1）
+DEFAULT_PNG_COMPRESSION = 1
+
 # ==================== ADOFAI Settings 模板 ====================
 
+# settings 固定骨架（导入时构建一次），可变字段由 get_adofai_settings 覆盖
+# 列表类的值存为元组，每次取用时再复制为新列表，避免各关卡共享同一个可变对象
+_BASE_SETTINGS = (
+    ("version", 15),
+    ("artist", ""),
+    ("specialArtistType", "None"),
+    ("artistPermission", ""),
+    ("song", ""),
+    ("author", ""),
+    ("separateCountdownTime", True),
+    ("previewImage", ""),
+    ("previewIcon", ""),
+    ("previewIconColor", "003f52"),
+    ("previewSongStart", 0),
+    ("previewSongDuration", 10),
+    ("seizureWarning", False),
+    ("levelDesc", ""),
+    ("levelTags", ""),
+    ("artistLinks", ""),
+    ("speedTrialAim", 0),
+    ("difficulty", 1),
+    ("requiredMods", ()),
+    ("songFilename", ""),
+    ("bpm", 100),
+    ("volume", 100),
+    ("offset", 0),
+    ("pitch", 100),
+    ("hitsound", "Kick"),
+    ("hitsoundVolume", 100),
+    ("countdownTicks", 4),
+    ("tileShape", "Short"),
+    ("trackColorType", "Single"),
+    ("trackColor", "000000"),
+    ("secondaryTrackColor", "ffffff"),
+    ("trackColorAnimDuration", 2),
+    ("trackColorPulse", "None"),
+    ("trackPulseLength", 10),
+    ("trackStyle", "Minimal"),
+    ("trackTexture", ""),
+    ("trackTextureScale", 1),
+    ("trackGlowIntensity", 100),
+    ("trackAnimation", "None"),
+    ("beatsAhead", 3),
+    ("trackDisappearAnimation", "None"),
+    ("beatsBehind", 4),
+    ("backgroundColor", "000000"),
+    ("showDefaultBGIfNoImage", True),
+    ("showDefaultBGTile", True),
+    ("defaultBGTileColor", "101121"),
+    ("defaultBGShapeType", "Default"),
+    ("defaultBGShapeColor", "ffffff"),
+    ("bgImage", ""),
+    ("bgImageColor", "ffffff"),
+    ("parallax", (100, 100)),
+    ("bgDisplayMode", "FitToScreen"),
+    ("imageSmoothing", True),
+    ("lockRot", False),
+    ("loopBG", False),
+    ("scalingRatio", 100),
+    ("relativeTo", "Player"),
+    ("position", (0, 0)),
+    ("rotation", 0),
+    ("zoom", 100),
+    ("pulseOnFloor", True),
+    ("startCamLowVFX", False),
+    ("bgVideo", ""),
+    ("loopVideo", False),
+    ("vidOffset", 0),
+    ("floorIconOutlines", False),
+    ("stickToFloors", True),
+    ("planetEase", "Linear"),
+    ("planetEaseParts", 1),
+    ("planetEasePartBehavior", "Mirror"),
+    ("customClass", ""),
+    ("defaultTextColor", "ffffff"),
+    ("defaultTextShadowColor", "00000050"),
+    ("congratsText", ""),
+    ("perfectText", ""),
+    ("legacyFlash", False),
+    ("legacyCamRelativeTo", False),
+    ("legacySpriteTiles", False),
+    ("legacyTween", False),
+    ("disableV15Features", False),
+)
+
+
+def _copy_value(val):
+    """骨架中的元组转换为新的列表（其他值不可变，原样返回）"""
+    return list(val) if isinstance(val, tuple) else val
+
+
+def _settings_overrides(level_desc, level_tags, bpm, zoom, track_color, position, relative_to):
+    """各关卡需要覆盖的settings项"""
+    if position is None:
+        position = [0, 0]
+    
+    return {
+        "levelDesc": level_desc,
+        "levelTags": level_tags,
+        "bpm": bpm,
+        "zoom": zoom,
+        "trackColor": track_color,
+        "position": position,
+        "relativeTo": relative_to,
+    }
+
+
 def get_adofai_settings(level_desc="", level_tags="", bpm=100, zoom=100, 
                         track_color="000000", position=None, relative_to="Player"):
     """
@@ -51,88 +166,25 @@ def get_adofai_settings(level_desc="", level_tags="", bpm=100, zoom=100,
     返回:
         list: settings配置列表
     """
-    if position is None:
-        position = [0, 0]
+    overrides = _settings_overrides(level_desc, level_tags, bpm, zoom, track_color, position, relative_to)
+    return [(key, overrides[key] if key in overrides else _copy_value(val)) for key, val in _BASE_SETTINGS]
+
+
+# 固定settings项的格式化结果（导入时格式化一次，生成关卡时只格式化覆盖项）
+_BASE_SETTINGS_LINES = tuple(f'\t\t"{key}": {format_value(_copy_value(val))}' for key, val in _BASE_SETTINGS)
+_BASE_SETTINGS_INDEX = {key: i for i, (key, _) in enumerate(_BASE_SETTINGS)}
+
+
+def get_adofai_settings_lines(level_desc="", level_tags="", bpm=100, zoom=100,
+                              track_color="000000", position=None, relative_to="Player"):
+    """
+    生成已格式化的ADOFAI关卡settings行（参数同 get_adofai_settings）
     
-    return [
-        ("version", 15),
-        ("artist", ""),
-        ("specialArtistType", "None"),
-        ("artistPermission", ""),
-        ("song", ""),
-        ("author", ""),
-        ("separateCountdownTime", True),
-        ("previewImage", ""),
-        ("previewIcon", ""),
-        ("previewIconColor", "003f52"),
-        ("previewSongStart", 0),
-        ("previewSongDuration", 10),
-        ("seizureWarning", False),
-        ("levelDesc", level_desc),
-        ("levelTags", level_tags),
-        ("artistLinks", ""),
-        ("speedTrialAim", 0),
-        ("difficulty", 1),
-        ("requiredMods", []),
-        ("songFilename", ""),
-        ("bpm", bpm),
-        ("volume", 100),
-        ("offset", 0),
-        ("pitch", 100),
-        ("hitsound", "Kick"),
-        ("hitsoundVolume", 100),
-        ("countdownTicks", 4),
-        ("tileShape", "Short"),
-        ("trackColorType", "Single"),
-        ("trackColor", track_color),
-        ("secondaryTrackColor", "ffffff"),
-        ("trackColorAnimDuration", 2),
-        ("trackColorPulse", "None"),
-        ("trackPulseLength", 10),
-        ("trackStyle", "Minimal"),
-        ("trackTexture", ""),
-        ("trackTextureScale", 1),
-        ("trackGlowIntensity", 100),
-        ("trackAnimation", "None"),
-        ("beatsAhead", 3),
-        ("trackDisappearAnimation", "None"),
-        ("beatsBehind", 4),
-        ("backgroundColor", "000000"),
-        ("showDefaultBGIfNoImage", True),
-        ("showDefaultBGTile", True),
-        ("defaultBGTileColor", "101121"),
-        ("defaultBGShapeType", "Default"),
-        ("defaultBGShapeColor", "ffffff"),
-        ("bgImage", ""),
-        ("bgImageColor", "ffffff"),
-        ("parallax", [100, 100]),
-        ("bgDisplayMode", "FitToScreen"),
-        ("imageSmoothing", True),
-        ("lockRot", False),
-        ("loopBG", False),
-        ("scalingRatio", 100),
-        ("relativeTo", relative_to),
-        ("position", position),
-        ("rotation", 0),
-        ("zoom", zoom),
-        ("pulseOnFloor", True),
-        ("startCamLowVFX", False),
-        ("bgVideo", ""),
-        ("loopVideo", False),
-        ("vidOffset", 0),
-        ("floorIconOutlines", False),
-        ("stickToFloors", True),
-        ("planetEase", "Linear"),
-        ("planetEaseParts", 1),
-        ("planetEasePartBehavior", "Mirror"),
-        ("customClass", ""),
-        ("defaultTextColor", "ffffff"),
-        ("defaultTextShadowColor", "00000050"),
-        ("congratsText", ""),
-        ("perfectText", ""),
-        ("legacyFlash", False),
-        ("legacyCamRelativeTo", False),
-        ("legacySpriteTiles", False),
-        ("legacyTween", False),
-        ("disableV15Features", False),
-    ]
+    返回:
+        list: 形如 '\t\t"key": value' 的字符串列表（不含逗号和换行）
+    """
+    overrides = _settings_overrides(level_desc, level_tags, bpm, zoom, track_color, position, relative_to)
+    lines = list(_BASE_SETTINGS_LINES)
+    for key, val in overrides.items():
+        lines[_BASE_SETTINGS_INDEX[key]] = f'\t\t"{key}": {format_value(val)}'
+    return lines
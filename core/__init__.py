@@ -4,10 +4,18 @@
 ADOFAI 工具集 - 核心模块
 """
 
-from .frame_extract import extract_frames
-from .image_resize import resize_image, batch_resize
-from .image2adofai import generate_image_adofai
-from .video2adofai import generate_video_adofai, generate_video_adofai_v2
+import importlib
+
+# 导出名 -> 所在子模块；子模块在首次访问时才导入，避免 import core 就加载 cv2/PIL
+_EXPORTS = {
+    'extract_frames': '.frame_extract',
+    'resize_image': '.image_resize',
+    'batch_resize': '.image_resize',
+    'generate_image_adofai': '.image2adofai',
+    'generate_video_adofai': '.video2adofai',
+    'generate_video_adofai_v2': '.video2adofai',
+    'generate_video_adofai_from_video': '.video2adofai',
+}
 
 __all__ = [
     'extract_frames',
@@ -16,4 +24,14 @@ __all__ = [
     'generate_image_adofai',
     'generate_video_adofai',
     'generate_video_adofai_v2',
+    'generate_video_adofai_from_video',
 ]
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -5,6 +5,16 @@
 """
 
 import os
+import sys
+import time
+import shutil
+import queue
+import threading
+import subprocess
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 
 try:
@@ -13,8 +23,373 @@ try:
 except ImportError:
     CV2_AVAILABLE = False
 
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import DEFAULT_JPEG_QUALITY, DEFAULT_PNG_COMPRESSION
+
+
+def _imwrite_params(image_format, compression):
+    """根据输出格式生成 cv2.imwrite 编码参数"""
+    if image_format == 'png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, compression]
+    if image_format in ('jpg', 'jpeg'):
+        return [cv2.IMWRITE_JPEG_QUALITY, DEFAULT_JPEG_QUALITY]
+    return []
+
+
+def _open_capture(video_path, hw_accel=True):
+    """
+    打开视频，优先尝试 FFMPEG 后端的硬件解码，不支持或初始化失败时回退到软件解码
+    
+    参数:
+        video_path: 视频文件路径
+        hw_accel: 是否尝试硬件解码（需要 OpenCV 4.5+）
+    """
+    if hw_accel and hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+        try:
+            # VIDEO_ACCELERATION_ANY 不能同时指定 CAP_PROP_HW_DEVICE，由后端自行选择设备
+            cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [
+                cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY,
+            ])
+            if cap.isOpened():
+                return cap
+            cap.release()
+        except cv2.error:
+            pass
+    return cv2.VideoCapture(video_path)
+
+
+def _cv2_autorotates(cap):
+    """
+    cv2是否按视频的旋转元数据自动旋转帧（OpenCV 4.5+ 的FFMPEG后端默认开启）
+    开启时 CAP_PROP_FRAME_WIDTH/HEIGHT 报告的是旋转后的尺寸，ffmpeg也需按同样的规则输出
+    """
+    prop = getattr(cv2, 'CAP_PROP_ORIENTATION_AUTO', None)
+    return prop is not None and cap.get(prop) != 0
+
+
+def _ffmpeg_input_args(ffmpeg_path, video_path, autorotate):
+    """ffmpeg命令的输入部分；autorotate为False时禁止按旋转元数据旋转，与cv2的行为保持一致"""
+    cmd = [ffmpeg_path, '-v', 'error']
+    if not autorotate:
+        cmd.append('-noautorotate')
+    return cmd + ['-i', video_path]
+
+
+def _iter_capture_frames(cap, step=1):
+    """
+    逐帧读取 cv2.VideoCapture 解码结果（BGR）
+    
+    参数:
+        cap: 已打开的 cv2.VideoCapture
+        step: 每step帧取1帧；丢弃的帧只 grab() 不 retrieve()，省去颜色空间转换和内存拷贝
+    """
+    if step == 1:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+        return
+    
+    index = 0
+    while cap.grab():
+        if index % step == 0:
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            yield frame
+        index += 1
+
+
+def _cuda_decode_available():
+    """检查 OpenCV 是否带有 cudacodec 模块并能找到CUDA设备"""
+    try:
+        return hasattr(cv2, 'cudacodec') and cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except cv2.error:
+        return False
+
+
+def _iter_cuda_frames(video_path):
+    """
+    使用 cv2.cudacodec（NVDEC）在GPU上解码视频，下载到内存后产出BGR帧
+    
+    参数:
+        video_path: 视频文件路径
+    """
+    reader = cv2.cudacodec.createVideoReader(video_path)
+    while True:
+        ret, gpu_frame = reader.nextFrame()
+        if not ret:
+            break
+        # cudacodec 默认输出BGRA
+        yield cv2.cvtColor(gpu_frame.download(), cv2.COLOR_BGRA2BGR)
+
+
+def _iter_pyav_frames(video_path):
+    """
+    使用 PyAV 多线程解码视频，产出BGR帧
+    
+    参数:
+        video_path: 视频文件路径
+    """
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        # 开启帧级+片级多线程解码
+        stream.thread_type = 'AUTO'
+        stream.thread_count = os.cpu_count() or 0
+        for frame in container.decode(stream):
+            yield frame.to_ndarray(format='bgr24')
+
+
+def _iter_ffmpeg_frames(ffmpeg_path, video_path, width, height, step=1, autorotate=True):
+    """
+    通过单个ffmpeg子进程解码视频，从管道读取原始BGR24帧
+    
+    参数:
+        ffmpeg_path: ffmpeg可执行文件路径
+        video_path: 视频文件路径
+        width, height: 帧尺寸
+        step: 每step帧取1帧（由ffmpeg的select滤镜丢帧，丢弃的帧不做像素格式转换和管道传输）
+        autorotate: 是否按旋转元数据旋转（须与得到width/height的cv2一致，见 _cv2_autorotates）
+    """
+    import numpy as np  # opencv-python 的依赖，cv2可用时必然存在
+    
+    frame_size = width * height * 3
+    # 帧尺寸取自cv2报告的宽高，旋转规则与cv2不一致时竖拍视频的宽高会对调，按字节切出的帧全部错位
+    cmd = _ffmpeg_input_args(ffmpeg_path, video_path, autorotate)
+    if step > 1:
+        cmd += ['-vf', f'select=not(mod(n\\,{step}))']
+    cmd += ['-f', 'rawvideo', '-pix_fmt', 'bgr24', '-vsync', '0', '-']
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=frame_size * 4)
+    
+    # 错误输出由后台线程读取，避免ffmpeg写满stderr管道后阻塞
+    stderr_chunks = []
+    stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+    stderr_thread.start()
+    
+    finished = False
+    try:
+        while True:
+            buf = proc.stdout.read(frame_size)
+            if len(buf) < frame_size:
+                break
+            yield np.frombuffer(buf, dtype=np.uint8).reshape(height, width, 3)
+        finished = True
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None and not finished:
+            # 调用方提前结束读取，由我们终止进程，不视为解码失败
+            proc.kill()
+        proc.wait()
+        stderr_thread.join()
+        proc.stderr.close()
+    
+    if proc.returncode != 0:
+        message = b"".join(stderr_chunks).decode(errors='replace').strip()
+        raise RuntimeError(f"ffmpeg 解码失败: {message or f'退出码 {proc.returncode}'}")
+
+
+# 预读线程结束标记
+_END = object()
+
+
+def _prefetch_frames(frames, maxsize):
+    """
+    在独立线程中迭代解码，最多预读maxsize帧，使解码与主线程的编码提交/等待重叠
+    （cap.read()、ffmpeg管道读取等解码操作都会释放GIL）
+    
+    参数:
+        frames: 帧可迭代对象
+        maxsize: 预读队列长度（限制内存占用）
+    """
+    q = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    errors = []
+    
+    def reader():
+        try:
+            for frame in frames:
+                q.put(frame)
+                if stop.is_set():
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            close = getattr(frames, 'close', None)
+            if close is not None:
+                close()
+            q.put(_END)
+    
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    item = None
+    try:
+        while True:
+            item = q.get()
+            if item is _END:
+                break
+            yield item
+    finally:
+        # 提前结束时通知预读线程停止，并取空队列让它能放入结束标记
+        stop.set()
+        while item is not _END:
+            item = q.get()
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+# 提取进度两次输出之间的最小间隔（秒）
+_PROGRESS_INTERVAL = 0.5
+
+
+def _write_frames(frames, top_dir, image_format, group_size, params, write_workers,
+                  start_index=0, total_frames=0, verbose=False):
+    """
+    将帧序列编码写入 part 分组目录（线程池并行编码）
+    
+    参数:
+        frames: 帧（BGR数组）可迭代对象
+        start_index: 第一帧之前已有的帧数（文件名使用绝对帧号）
+        其余参数同 extract_frames
+    
+    返回:
+        int: 成功写入的帧数
+    """
+    frame_count = start_index
+    saved_count = 0
+    
+    # 图片编码在线程池中进行（cv2编码时释放GIL），与解码并行；
+    # 限制待写入帧数，避免解码快于编码时内存无限增长
+    max_pending = write_workers * 4
+    pending = deque()
+    last_group = -1
+    # 解码很快时每100帧一行会刷屏，终端输出反而拖慢提取，两次输出之间至少间隔 _PROGRESS_INTERVAL 秒
+    next_report = 0.0
+    
+    with ThreadPoolExecutor(max_workers=write_workers) as pool:
+        for frame in frames:
+            frame_count += 1
+            
+            group_index = (frame_count - 1) // group_size + 1
+            if group_index != last_group:
+                # 只在进入新分组时创建目录，避免每帧一次系统调用
+                group_folder = os.path.join(top_dir, f"part{group_index}")
+                os.makedirs(group_folder, exist_ok=True)
+                last_group = group_index
+            
+            filename = f"{frame_count}.{image_format}"
+            filepath = os.path.join(group_folder, filename)
+            
+            pending.append(pool.submit(cv2.imwrite, filepath, frame, params))
+            if len(pending) >= max_pending and pending.popleft().result():
+                saved_count += 1
+            
+            if verbose and frame_count % 100 == 0 and time.monotonic() >= next_report:
+                next_report = time.monotonic() + _PROGRESS_INTERVAL
+                if total_frames > 0:
+                    pct = frame_count / total_frames * 100
+                    print(f"  已处理: {frame_count}/{total_frames} 帧 ({pct:.1f}%) [当前组: part{group_index}]")
+                else:
+                    print(f"  已处理: {frame_count} 帧 [当前组: part{group_index}]")
+        
+        while pending:
+            if pending.popleft().result():
+                saved_count += 1
+    
+    return saved_count
+
+
+def _extract_ffmpeg_image2(ffmpeg_path, video_path, top_dir, image_format, group_size, compression,
+                           frame_step=1, autorotate=True):
+    """
+    由单个ffmpeg进程完成解码+编码，直接写出图片文件（image2输出，不经过Python），
+    完成后再把文件按分组移动到 part 目录
+    
+    参数:
+        ffmpeg_path: ffmpeg可执行文件路径
+        autorotate: 是否按旋转元数据旋转（与opencv解码的方向保持一致）
+        其余参数同 extract_frames
+    
+    返回:
+        tuple: (成功写入的帧数, 错误信息或None)
+    """
+    cmd = _ffmpeg_input_args(ffmpeg_path, video_path, autorotate)
+    if frame_step > 1:
+        cmd += ['-vf', f'select=not(mod(n\\,{frame_step}))']
+    cmd += ['-vsync', '0']
+    if image_format == 'png':
+        cmd += ['-compression_level', str(compression)]
+    elif image_format in ('jpg', 'jpeg'):
+        # mjpeg 的 qscale 1~31，越小质量越高；2 约相当于 JPEG 质量95
+        cmd += ['-qmin', '1', '-qscale:v', '2']
+    cmd += ['-start_number', '1', '-y', os.path.join(top_dir, f'%d.{image_format}')]
+    
+    proc = subprocess.run(cmd, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        return 0, proc.stderr.decode(errors='replace').strip() or f'ffmpeg 退出码 {proc.returncode}'
+    
+    # 文件名即帧号，按帧号移动到对应分组（同一文件系统内 rename，不复制数据）
+    saved_count = 0
+    last_group = -1
+    while True:
+        frame_number = saved_count + 1
+        src = os.path.join(top_dir, f'{frame_number}.{image_format}')
+        if not os.path.exists(src):
+            break
+        group_index = (frame_number - 1) // group_size + 1
+        if group_index != last_group:
+            group_folder = os.path.join(top_dir, f"part{group_index}")
+            os.makedirs(group_folder, exist_ok=True)
+            last_group = group_index
+        os.replace(src, os.path.join(group_folder, f'{frame_number}.{image_format}'))
+        saved_count += 1
+    return saved_count, None
+
 
-def extract_frames(video_path, output_base_dir=None, image_format='png', group_size=1000, verbose=True):
+def _seek_exact(cap, frame_idx):
+    """
+    定位到指定帧并读回实际位置
+    
+    返回:
+        bool: 是否精确定位（缺少索引、可变帧率等视频上 CAP_PROP_POS_FRAMES 定位可能不准确）
+    """
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+    return int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_idx
+
+
+def _extract_range(video_path, start_frame, end_frame, top_dir, image_format, group_size, params,
+                   hw_accel=True, frame_step=1):
+    """
+    子进程任务：独立打开视频，解码 [start_frame, end_frame) 区间的帧并写出
+    end_frame 为 None 时读到视频结尾；start_frame 需为 frame_step 的整数倍
+    
+    返回:
+        int: 成功写入的帧数
+    """
+    cap = _open_capture(video_path, hw_accel)
+    try:
+        if start_frame > 0 and not _seek_exact(cap, start_frame):
+            raise RuntimeError(f"无法精确定位到第 {start_frame} 帧")
+        frames = _iter_capture_frames(cap, frame_step)
+        if end_frame is not None:
+            frames = islice(frames, -(-(end_frame - start_frame) // frame_step))
+        frames = _prefetch_frames(frames, 4)
+        return _write_frames(frames, top_dir, image_format, group_size, params,
+                             write_workers=1, start_index=start_frame // frame_step)
+    finally:
+        cap.release()
+
+
+def extract_frames(video_path, output_base_dir=None, image_format='png', group_size=1000, verbose=True,
+                   write_workers=None, decoder='auto', compression=None, num_workers=1,
+                   hw_accel=True, frame_step=1, encoder='opencv'):
     """
     从视频中提取帧并分组保存
     
@@ -24,6 +399,16 @@ def extract_frames(video_path, output_base_dir=None, image_format='png', group_s
         image_format: 图片格式（png/jpg，默认png）
         group_size: 每组帧数（默认1000）
         verbose: 是否显示进度信息
+        write_workers: 写图片的线程数（默认CPU核心数）
+        decoder: 解码方式 ('auto', 'opencv', 'ffmpeg', 'pyav', 'cuda')，auto时优先使用ffmpeg管道，
+                 pyav需要安装 av 包，cuda需要带 cudacodec 模块的 OpenCV 构建
+        compression: PNG压缩级别0-9（默认从config读取）
+        num_workers: 解码进程数（>1时按帧区间切分视频并行解码，需要视频提供总帧数，
+                     依赖 CAP_PROP_POS_FRAMES 精确定位，仅使用 opencv 解码；条件不满足时提示并改为单进程）
+        hw_accel: opencv 解码时是否尝试硬件加速（失败自动回退软件解码）
+        frame_step: 每N帧取1帧（默认1，即全部帧；输出文件按保留帧连续编号）
+        encoder: 图片编码方式 ('opencv', 'ffmpeg')，ffmpeg时由单个ffmpeg进程直接解码并写出图片，
+                 不经过Python（忽略 decoder/num_workers/write_workers）
     
     返回:
         dict: {'success': bool, 'frame_count': int, 'output_dir': str, 'error': str or None}
@@ -44,6 +429,54 @@ def extract_frames(video_path, output_base_dir=None, image_format='png', group_s
             'error': f'视频文件不存在: {video_path}'
         }
     
+    if encoder not in ('opencv', 'ffmpeg'):
+        return {
+            'success': False,
+            'frame_count': 0,
+            'output_dir': None,
+            'error': f'未知编码方式: {encoder}'
+        }
+    
+    ffmpeg_path = shutil.which('ffmpeg') if decoder in ('auto', 'ffmpeg') or encoder == 'ffmpeg' else None
+    if (decoder == 'ffmpeg' or encoder == 'ffmpeg') and ffmpeg_path is None:
+        return {
+            'success': False,
+            'frame_count': 0,
+            'output_dir': None,
+            'error': '未找到 ffmpeg，请安装后加入PATH或使用 opencv 解码'
+        }
+    if decoder == 'pyav' and not AV_AVAILABLE:
+        return {
+            'success': False,
+            'frame_count': 0,
+            'output_dir': None,
+            'error': '需要安装 PyAV: pip install av'
+        }
+    if decoder == 'cuda' and not _cuda_decode_available():
+        return {
+            'success': False,
+            'frame_count': 0,
+            'output_dir': None,
+            'error': '当前 OpenCV 不支持 cudacodec 或未找到CUDA设备，请使用其他解码方式'
+        }
+    if decoder not in ('auto', 'opencv', 'ffmpeg', 'pyav', 'cuda'):
+        return {
+            'success': False,
+            'frame_count': 0,
+            'output_dir': None,
+            'error': f'未知解码方式: {decoder}'
+        }
+    if frame_step < 1:
+        return {
+            'success': False,
+            'frame_count': 0,
+            'output_dir': None,
+            'error': f'帧间隔必须>=1: {frame_step}'
+        }
+    
+    if compression is None:
+        compression = DEFAULT_PNG_COMPRESSION
+    
     video_name = os.path.splitext(os.path.basename(video_path))[0]
     
     if output_base_dir is None:
@@ -52,7 +485,7 @@ def extract_frames(video_path, output_base_dir=None, image_format='png', group_s
     top_dir = os.path.join(output_base_dir, video_name)
     os.makedirs(top_dir, exist_ok=True)
     
-    cap = cv2.VideoCapture(video_path)
+    cap = _open_capture(video_path, hw_accel)
     if not cap.isOpened():
         return {
             'success': False,
@@ -65,40 +498,127 @@ def extract_frames(video_path, output_base_dir=None, image_format='png', group_s
     fps = cap.get(cv2.CAP_PROP_FPS)
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    # ffmpeg解码时采用与cv2相同的旋转规则，各解码方式输出的帧方向、尺寸一致
+    autorotate = _cv2_autorotates(cap)
+    
+    # 多进程分段解码依赖总帧数切分区间，且只能使用 opencv 解码
+    parallel = (num_workers > 1 and total_frames > 0 and decoder in ('auto', 'opencv')
+                and encoder == 'opencv')
+    serial_reason = None
+    if parallel:
+        chunk = -(-total_frames // num_workers)
+        # 区间起点对齐到 frame_step，保证各段取到的帧与串行一致
+        chunk = -(-chunk // frame_step) * frame_step
+        ranges = [[start, start + chunk] for start in range(0, total_frames, chunk)]
+        ranges[-1][1] = None  # 最后一段读到结尾，容忍总帧数元数据不准确
+        # 各分段起点都必须能精确定位，否则分段之间会重复或漏帧
+        if not all(_seek_exact(cap, start) for start, _ in ranges[1:]):
+            parallel = False
+            serial_reason = '视频无法按帧号精确定位'
+            cap.release()
+            cap = _open_capture(video_path, hw_accel)
+    elif num_workers > 1:
+        serial_reason = (f'{decoder} 解码不支持多进程分段' if decoder not in ('auto', 'opencv')
+                         else 'ffmpeg 编码不支持多进程分段' if encoder == 'ffmpeg'
+                         else '视频未提供总帧数')
+    # ffmpeg管道需要预先知道帧尺寸
+    use_ffmpeg = not parallel and ffmpeg_path is not None and width > 0 and height > 0
+    
+    if encoder == 'ffmpeg':
+        backend = 'ffmpeg（直接输出图片）'
+    elif decoder in ('pyav', 'cuda'):
+        backend = decoder
+    elif use_ffmpeg:
+        backend = 'ffmpeg'
+    else:
+        backend = 'opencv'
     
     if verbose:
         print(f"\n视频信息:")
         print(f"  总帧数: {total_frames if total_frames > 0 else '未知'}")
         print(f"  帧率: {fps:.2f} fps")
         print(f"  分辨率: {width}x{height}")
+        print(f"  解码: {backend}"
+              + (f"（{num_workers} 进程）" if parallel else ""))
+        if serial_reason is not None:
+            print(f"  ⚠️  {serial_reason}，改为单进程解码")
+        if backend == 'opencv' and hw_accel and hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+            # 打开时请求了硬件解码，此处读取后端实际采用的加速类型（0表示未启用）
+            if cap.get(cv2.CAP_PROP_HW_ACCELERATION) > 0:
+                print("  硬件解码: 已启用")
+            else:
+                print("  硬件解码: 未启用（使用软件解码）")
+        if frame_step > 1:
+            print(f"  每 {frame_step} 帧取 1 帧")
         print(f"\n开始提取帧（每 {group_size} 帧一组）...\n")
     
-    frame_count = 0
-    saved_count = 0
+    if write_workers is None:
+        write_workers = os.cpu_count() or 1
+    params = _imwrite_params(image_format, compression)
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        frame_count += 1
-        
-        group_index = (frame_count - 1) // group_size + 1
-        group_folder = os.path.join(top_dir, f"part{group_index}")
-        os.makedirs(group_folder, exist_ok=True)
+    if encoder == 'ffmpeg':
+        cap.release()
+        saved_count, error = _extract_ffmpeg_image2(ffmpeg_path, video_path, top_dir, image_format, group_size,
+                                                    compression, frame_step, autorotate)
+        if error is not None:
+            return {
+                'success': False,
+                'frame_count': saved_count,
+                'output_dir': os.path.abspath(top_dir),
+                'error': error
+            }
+    elif parallel:
+        # 按帧区间切分给多个进程，每个进程独立打开视频；文件名使用绝对帧号，分组结果与串行一致
+        cap.release()
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(ranges), mp_context=ctx) as pool:
+            futures = [
+                pool.submit(_extract_range, video_path, start, end, top_dir, image_format, group_size, params,
+                            hw_accel, frame_step)
+                for start, end in ranges
+            ]
+            saved_count = 0
+            try:
+                for i, future in enumerate(futures, 1):
+                    saved_count += future.result()
+                    if verbose:
+                        print(f"  已完成分段: {i}/{len(futures)}")
+            except RuntimeError as e:
+                # 子进程中定位失败（已在主进程预先检查，极少发生），分段结果不完整，按失败返回
+                return {
+                    'success': False,
+                    'frame_count': 0,
+                    'output_dir': os.path.abspath(top_dir),
+                    'error': str(e)
+                }
+    else:
+        if backend == 'pyav':
+            cap.release()
+            frames = islice(_iter_pyav_frames(video_path), 0, None, frame_step)
+        elif backend == 'cuda':
+            cap.release()
+            frames = islice(_iter_cuda_frames(video_path), 0, None, frame_step)
+        elif backend == 'ffmpeg':
+            # cv2只用于读取视频信息，解码交给ffmpeg管道
+            cap.release()
+            frames = _iter_ffmpeg_frames(ffmpeg_path, video_path, width, height, frame_step, autorotate)
+        else:
+            frames = _iter_capture_frames(cap, frame_step)
         
-        filename = f"{frame_count}.{image_format}"
-        filepath = os.path.join(group_folder, filename)
-        
-        success = cv2.imwrite(filepath, frame)
-        if success:
-            saved_count += 1
-            if verbose and frame_count % 100 == 0:
-                if total_frames > 0:
-                    pct = frame_count / total_frames * 100
-                    print(f"  已处理: {frame_count}/{total_frames} 帧 ({pct:.1f}%) [当前组: part{group_index}]")
-                else:
-                    print(f"  已处理: {frame_count} 帧 [当前组: part{group_index}]")
+        # 解码在预读线程中进行，主线程只负责分发编码任务
+        frames = _prefetch_frames(frames, write_workers * 2)
+        try:
+            saved_count = _write_frames(frames, top_dir, image_format, group_size, params, write_workers,
+                                        total_frames=-(-total_frames // frame_step), verbose=verbose)
+        except RuntimeError as e:
+            # ffmpeg中途出错（文件损坏、不支持的编码等）时已写出的帧不完整，按失败返回
+            cap.release()
+            return {
+                'success': False,
+                'frame_count': 0,
+                'output_dir': os.path.abspath(top_dir),
+                'error': str(e)
+            }
     
     cap.release()
     
@@ -126,6 +646,18 @@ def main():
                        help='输出图片格式（默认png）')
     parser.add_argument('-g', '--group', type=int, default=1000,
                        help='每组帧数（默认1000）')
+    parser.add_argument('-c', '--compression', type=int, default=DEFAULT_PNG_COMPRESSION, choices=range(10),
+                       metavar='0-9', help=f'PNG压缩级别（默认{DEFAULT_PNG_COMPRESSION}）')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                       help='并行解码进程数（默认1）')
+    parser.add_argument('--no-hwaccel', action='store_true',
+                       help='禁用 opencv 硬件解码')
+    parser.add_argument('--decoder', default='auto', choices=['auto', 'opencv', 'ffmpeg', 'pyav', 'cuda'],
+                       help='解码方式（默认auto，优先使用ffmpeg）')
+    parser.add_argument('-s', '--step', type=int, default=1,
+                       help='每N帧取1帧（默认1）')
+    parser.add_argument('--encoder', default='opencv', choices=['opencv', 'ffmpeg'],
+                       help='图片编码方式（默认opencv；ffmpeg时由ffmpeg直接解码并写出图片）')
     
     args = parser.parse_args()
     
@@ -134,7 +666,13 @@ def main():
         output_base_dir=args.output,
         image_format=args.format,
         group_size=args.group,
-        verbose=True
+        verbose=True,
+        decoder=args.decoder,
+        compression=args.compression,
+        num_workers=args.workers,
+        hw_accel=not args.no_hwaccel,
+        frame_step=args.step,
+        encoder=args.encoder
     )
     
     if not result['success']:
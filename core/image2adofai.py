@@ -14,11 +14,18 @@ except ImportError:
     PIL_AVAILABLE = False
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import format_value, clean_path, resolve_output_path, get_script_dir, pixel_to_hex, print_progress
-from config import get_adofai_settings, DEFAULT_Y_OFFSET
+from utils import clean_path, resolve_output_path, get_script_dir, image_to_hex_colors, print_progress
+from config import get_adofai_settings_lines, DEFAULT_Y_OFFSET, WRITE_BUFFER_SIZE
 
 
-def generate_image_adofai(image_path, output_path, y_offset=None):
+# ColorTrack事件模板（只有floor和颜色会变化）：% (floor, color)
+COLOR_TMPL = '\t\t{ "floor": %d, "eventType": "ColorTrack", "trackColorType": "Single", "trackColor": "%s", "secondaryTrackColor": "ffffff", "trackColorAnimDuration": 2, "trackColorPulse": "None", "trackPulseLength": 10, "trackStyle": "Minimal", "trackTexture": "", "trackTextureScale": 1, "trackGlowIntensity": 100, "justThisTile": false}'
+
+# 换行PositionTrack事件模板：% (floor, x, y)
+POS_TMPL = '\t\t{ "floor": %d, "eventType": "PositionTrack", "positionOffset": [%s, %s], "relativeTo": [0, "ThisTile"], "justThisTile": false, "editorOnly": false}'
+
+
+def generate_image_adofai(image_path, output_path, y_offset=None, include_alpha=True):
     """
     将单张图片转换为 ADOFAI 像素艺术关卡
     
@@ -26,6 +33,7 @@ def generate_image_adofai(image_path, output_path, y_offset=None):
         image_path: 输入图片路径
         output_path: 输出 .adofai 文件路径
         y_offset: Y轴偏移量（正数，控制行间距，默认从config读取）
+        include_alpha: 颜色是否包含alpha（False时按RGB输出6位"rrggbb"）
     
     返回:
         bool: 是否成功
@@ -41,8 +49,9 @@ def generate_image_adofai(image_path, output_path, y_offset=None):
     
     try:
         with Image.open(image_path) as img:
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
+            mode = 'RGBA' if include_alpha else 'RGB'
+            if img.mode != mode:
+                img = img.convert(mode)
             
             width, height = img.size
             total_pixels = width * height
@@ -53,89 +62,83 @@ def generate_image_adofai(image_path, output_path, y_offset=None):
             print(f"图片尺寸: {width}x{height} = {total_pixels} 个像素")
             print(f"砖块布局: {width}×{height} 矩阵 (共 {total_pixels} 个砖块)")
             
-            pixels = list(img.getdata())
+            hex_colors = image_to_hex_colors(img)
             
-            first_pixel = pixels[0]
-            first_color = pixel_to_hex(*first_pixel)
-            
-            lines = []
-            lines.append("{")
+            first_color = hex_colors[0]
             
             # angleData
             link_count = total_pixels - 1
-            angles = ", ".join(["0"] * link_count)
-            lines.append(f'\t"angleData": [{angles}], ')
-            
-            # settings
-            lines.append('\t"settings":')
-            lines.append('\t{')
+            # 全为0，直接用字符串乘法生成，不构造N元素列表
+            angles = "0" + ", 0" * (link_count - 1) if link_count else ""
             
-            settings = get_adofai_settings(
+            settings_lines = get_adofai_settings_lines(
                 level_desc=f"PixelArt {width}×{height}",
                 level_tags="pixelart",
                 track_color=first_color
             )
             
-            for i, (key, val) in enumerate(settings):
-                comma = "," if i < len(settings) - 1 else ""
-                lines.append(f'\t\t"{key}": {format_value(val)}{comma}')
-            
-            lines.append('\t},')
-            
-            # actions
-            lines.append('\t"actions":')
-            lines.append('\t[')
-            
-            actions = []
-            
-            print("生成像素事件...")
-            for idx in range(1, total_pixels):
-                floor = idx
+            # 边生成边写入，不在内存中保留完整的事件列表
+            with open(output_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+                f.write(b"{\n")
+                f.write(f'\t"angleData": [{angles}], \n'.encode())
                 
-                pixel_position = idx - 1
-                col = pixel_position % width
-                row = pixel_position // width
+                # settings
+                f.write(b'\t"settings":\n')
+                f.write(b'\t{\n')
                 
-                hex_color = pixel_to_hex(*pixels[idx])
+                f.write(",\n".join(settings_lines).encode('utf-8'))
+                f.write(b"\n")
                 
-                # ColorTrack事件
-                color_action = (floor, f'\t\t{{ "floor": {floor}, "eventType": "ColorTrack", "trackColorType": "Single", "trackColor": "{hex_color}", "secondaryTrackColor": "ffffff", "trackColorAnimDuration": 2, "trackColorPulse": "None", "trackPulseLength": 10, "trackStyle": "Minimal", "trackTexture": "", "trackTextureScale": 1, "trackGlowIntensity": 100, "justThisTile": false}}')
-                actions.append(color_action)
+                f.write(b'\t},\n')
                 
-                # 换行PositionTrack
-                if col == width - 1:
-                    y_value = -y_offset
-                    pos_action = (floor, f'\t\t{{ "floor": {floor}, "eventType": "PositionTrack", "positionOffset": [{-width}, {y_value}], "relativeTo": [0, "ThisTile"], "justThisTile": false, "editorOnly": false}}')
-                    actions.append(pos_action)
+                # actions
+                f.write(b'\t"actions":\n')
+                f.write(b'\t[\n')
                 
-                # 每5%更新进度
-                if idx % max(1, total_pixels // 20) == 0 or idx == total_pixels - 1:
-                    print_progress(idx, total_pixels - 1, prefix="  处理像素", suffix="")
-            
-            actions.sort(key=lambda x: x[0])
-            
-            for i, (_, action_str) in enumerate(actions):
-                if i < len(actions) - 1:
-                    lines.append(action_str + ",")
-                else:
-                    lines.append(action_str)
-            
-            lines.append('\t],')
-            
-            # decorations
-            lines.append('\t"decorations":')
-            lines.append('\t[')
-            lines.append('\t]')
-            
-            lines.append("}")
-            
-            content = "\n".join(lines)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+                action_count = 0
+                sep = b""
+                
+                print("生成像素事件...")
+                # 按行批量生成：每行的事件用列表推导套模板后一次写入；
+                # floor随像素序号递增，事件天然按floor顺序生成，无需再排序
+                last_floor = total_pixels - 1
+                for row in range(height):
+                    start = row * width + 1
+                    stop = min(start + width, total_pixels)
+                    if start >= stop:
+                        continue
+                    
+                    # ColorTrack事件
+                    row_actions = [COLOR_TMPL % (floor, hex_colors[floor])
+                                   for floor in range(start, stop)]
+                    
+                    # 换行PositionTrack（行末像素所在的floor）
+                    if stop - start == width:
+                        row_actions.append(POS_TMPL % (stop - 1, -width, -y_offset))
+                    
+                    f.write(sep)
+                    f.write(",\n".join(row_actions).encode())
+                    sep = b",\n"
+                    action_count += len(row_actions)
+                    
+                    # 每5%更新进度
+                    if row % max(1, height // 20) == 0 or stop - 1 == last_floor:
+                        print_progress(stop - 1, last_floor, prefix="  处理像素", suffix="")
+                
+                if action_count:
+                    f.write(b"\n")
+                f.write(b'\t],\n')
+                
+                # decorations
+                f.write(b'\t"decorations":\n')
+                f.write(b'\t[\n')
+                f.write(b'\t]\n')
+                
+                f.write(b"}")
             
             print(f"✓ 成功生成 ADOFAI 关卡: {output_path}")
             print(f"  首像素颜色: {first_color} (已写入 settings.trackColor)")
-            print(f"  事件数量: {len(actions)} 个")
+            print(f"  事件数量: {action_count} 个")
             print(f"  换行次数: {height - 1} 次")
             
             return True
@@ -161,6 +164,8 @@ def main():
     parser.add_argument('-o', '--output', help='输出 .adofai 文件路径（默认使用图片名）')
     parser.add_argument('-y', '--y-offset', type=float, default=DEFAULT_Y_OFFSET, 
                        help=f'Y轴偏移量（正数，默认{DEFAULT_Y_OFFSET}）')
+    parser.add_argument('--no-alpha', action='store_true',
+                       help='颜色不含alpha通道（输出6位rrggbb）')
     
     args = parser.parse_args()
     
@@ -172,7 +177,7 @@ def main():
     out_path = resolve_output_path(args.output, img_path, script_dir)
     
     try:
-        generate_image_adofai(img_path, out_path, args.y_offset)
+        generate_image_adofai(img_path, out_path, args.y_offset, include_alpha=not args.no_alpha)
     except Exception:
         sys.exit(1)
 
@@ -4,22 +4,179 @@
 图片批量缩放模块
 """
 
+import io
 import os
 import re
+import platform
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 try:
-    from PIL import Image
+    import PIL
+    from PIL import Image, UnidentifiedImageError, features
     PIL_AVAILABLE = True
+    # 模块加载时取一次，避免每张图片都做属性查找
+    _LANCZOS = Image.Resampling.LANCZOS
+    # 调色板量化方法：有 libimagequant 时画质更好，否则使用内置的快速八叉树（两者都支持RGBA）
+    _QUANTIZE_METHOD = (Image.Quantize.LIBIMAGEQUANT if features.check_feature('libimagequant')
+                        else Image.Quantize.FASTOCTREE)
 except ImportError:
     PIL_AVAILABLE = False
 
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import natural_sort_key
+from utils import natural_sort_key, print_progress, scan_image_files
+
+
+# part分组目录名正则（模块加载时编译一次）
+_PART_RE = re.compile(r'^part\d+', re.IGNORECASE)
+
+
+def _pillow_simd_missing():
+    """x86 CPU 上使用的是普通 Pillow（而非 Pillow-SIMD，其版本号带 .postN 后缀）时返回True"""
+    if not PIL_AVAILABLE:
+        return False
+    if platform.machine().lower() not in ('x86_64', 'amd64', 'i386', 'i686', 'x86'):
+        return False
+    return '.post' not in PIL.__version__
+
+
+def _target_size(orig_w, orig_h, mode, width, height, percent):
+    """按缩放模式计算目标尺寸，未知模式返回None"""
+    if mode == 'width':
+        return width, int(orig_h * (width / orig_w))
+    if mode == 'height':
+        return int(orig_w * (height / orig_h)), height
+    if mode == 'fixed':
+        return width, height
+    if mode == 'percent':
+        return int(orig_w * percent / 100), int(orig_h * percent / 100)
+    return None
+
+
+# 按扩展名限定 Image.open 尝试的格式插件，避免逐个插件探测文件头
+_OPEN_FORMATS = {'png': ('PNG',), 'jpg': ('JPEG',), 'jpeg': ('JPEG',)}
+
+
+def _output_up_to_date(input_path, output_path, mode, width, height, percent):
+    """
+    输出文件已存在、不早于源文件且尺寸与本次的目标尺寸一致时返回True
+    （尺寸只读取两张图片的头信息；没有Pillow时无法读取，总是重新处理）
+    """
+    try:
+        if os.stat(output_path).st_mtime < os.stat(input_path).st_mtime:
+            return False
+    except OSError:
+        return False
+    if not PIL_AVAILABLE:
+        return False
+    try:
+        with Image.open(input_path) as src:
+            src_size = src.size
+        with Image.open(output_path) as out:
+            out_size = out.size
+    except (OSError, UnidentifiedImageError):
+        return False
+    return out_size == _target_size(*src_size, mode, width, height, percent)
 
 
-def resize_image(input_path, output_path, mode, width=0, height=0, percent=0, quality=95):
+def _save_args(file_ext, quality, png_level, progressive, optimize=False):
+    """
+    按扩展名确定PIL保存参数
+    
+    参数:
+        file_ext: 小写扩展名（不含点，如 'png'）
+        quality: JPEG质量
+        png_level: PNG压缩级别0-9
+        progressive: 是否保存为渐进式JPEG
+        optimize: JPEG是否额外做一遍霍夫曼表优化（体积略小，编码更慢）
+    
+    返回:
+        tuple: (format, kwargs)，format为None时由PIL按扩展名推断
+    """
+    if file_ext in ('jpg', 'jpeg'):
+        return 'JPEG', {'quality': quality, 'optimize': optimize, 'progressive': progressive}
+    if file_ext == 'png':
+        # 不使用optimize（会强制按最高级别压缩）
+        return 'PNG', {'compress_level': png_level}
+    return None, {}
+
+
+# PIL模式 → 写出前转换为OpenCV通道顺序所需的cvtColor代码（None表示无需转换）
+_PIL_TO_CV2 = {'L': None, 'RGB': 'COLOR_RGB2BGR', 'RGBA': 'COLOR_RGBA2BGRA'}
+
+
+def _save_png_cv2(img, output_path, png_level):
+    """
+    使用 OpenCV(libpng) 编码并写出PIL图片为PNG，比PIL的PNG编码器更快
+    
+    返回:
+        bool: 是否写出成功；图片模式不支持时返回False，由调用方改用PIL保存
+    """
+    if img.mode not in _PIL_TO_CV2:
+        return False
+    import numpy as np  # opencv-python 的依赖，cv2可用时必然存在
+    
+    arr = np.asarray(img)
+    code = _PIL_TO_CV2[img.mode]
+    if code is not None:
+        arr = cv2.cvtColor(arr, getattr(cv2, code))
+    return cv2.imwrite(str(output_path), arr, [cv2.IMWRITE_PNG_COMPRESSION, png_level])
+
+
+def _resize_cv2(input_path, output_path, mode, width, height, percent, quality, png_level, progressive,
+                optimize=False):
+    """
+    使用 OpenCV 完成 读取→缩放→写出（C实现的SIMD缩放，无PIL对象开销）
+    
+    返回:
+        tuple: 同 resize_image；cv2无法读取或写出该文件时（如Windows上的非ASCII路径）返回None，由调用方回退到PIL
+    """
+    arr = cv2.imread(str(input_path), cv2.IMREAD_UNCHANGED)
+    if arr is None:
+        return None
+    
+    orig_h, orig_w = arr.shape[:2]
+    size = _target_size(orig_w, orig_h, mode, width, height, percent)
+    if size is None:
+        return False, None, f"未知模式: {mode}"
+    new_w, new_h = size
+    
+    if (new_w, new_h) == (orig_w, orig_h):
+        shutil.copyfile(input_path, output_path)
+        return True, (new_w, new_h), None
+    
+    # 只有显式指定 --backend cv2 时才会走到这里：缩小时使用INTER_AREA（按面积平均，无摩尔纹，比LANCZOS4快得多，
+    # 但比LANCZOS柔和），放大时仍使用LANCZOS4；默认的PIL路径始终使用LANCZOS
+    if new_w <= orig_w and new_h <= orig_h:
+        interpolation = cv2.INTER_AREA
+    else:
+        interpolation = cv2.INTER_LANCZOS4
+    resized = cv2.resize(arr, (new_w, new_h), interpolation=interpolation)
+    
+    file_ext = str(input_path).lower().split('.')[-1]
+    if file_ext in ['jpg', 'jpeg']:
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_OPTIMIZE, int(optimize),
+                  cv2.IMWRITE_JPEG_PROGRESSIVE, int(progressive)]
+    elif file_ext == 'png':
+        params = [cv2.IMWRITE_PNG_COMPRESSION, png_level]
+    else:
+        params = []
+    
+    if not cv2.imwrite(str(output_path), resized, params):
+        return None
+    return True, (new_w, new_h), None
+
+
+def resize_image(input_path, output_path, mode, width=0, height=0, percent=0, quality=95, png_level=6,
+                 progressive=False, backend='pil', save_args=None, palette=False, optimize=False):
     """
     缩放单张图片
     
@@ -31,40 +188,90 @@ def resize_image(input_path, output_path, mode, width=0, height=0, percent=0, qu
         height: 目标高度（mode=height/fixed时）
         percent: 缩放百分比（mode=percent时）
         quality: JPEG质量（默认95）
+        png_level: PNG压缩级别0-9（默认6，速度与体积的平衡点）
+        progressive: 是否保存为渐进式JPEG（体积略小，编码略慢）
+        backend: 缩放实现 ('pil', 'cv2')，默认pil；cv2需显式指定（插值与PIL不同，输出像素会有差异）
+        save_args: 预先确定的PIL保存参数 (format, kwargs)，为None时按扩展名确定
+        palette: PNG输出量化为256色调色板图片（有损，文件更小、编解码更快；使用PIL缩放）
+        optimize: JPEG输出是否做霍夫曼表优化（默认关闭，中间帧不值得多一遍编码）
     
     返回:
         tuple: (success: bool, new_size: tuple or None, error: str or None)
     """
+    file_ext = os.path.splitext(str(input_path))[1][1:].lower()
+    
+    if palette and file_ext == 'png':
+        # cv2 无法输出调色板PNG
+        use_cv2 = False
+    elif backend == 'cv2':
+        if not CV2_AVAILABLE:
+            return False, None, "需要安装 opencv-python: pip install opencv-python"
+        use_cv2 = True
+    else:
+        use_cv2 = False
+    
+    if use_cv2:
+        try:
+            result = _resize_cv2(input_path, output_path, mode, width, height, percent,
+                                 quality, png_level, progressive, optimize)
+        except Exception as e:
+            return False, None, str(e)
+        if result is not None:
+            return result
+    
     if not PIL_AVAILABLE:
         return False, None, "需要安装 Pillow: pip install Pillow"
     
     try:
-        img = Image.open(input_path)
+        # 一次 read() 读入整个文件再交给PIL解析，代替解析过程中的大量小块读取（网络盘上尤其明显）
+        with open(input_path, 'rb') as f:
+            data = f.read()
+        try:
+            img = Image.open(io.BytesIO(data), formats=_OPEN_FORMATS.get(file_ext))
+        except UnidentifiedImageError:
+            # 扩展名与实际格式不符时，回退到自动识别
+            try:
+                img = Image.open(io.BytesIO(data))
+            except UnidentifiedImageError:
+                return False, None, f"无法识别的图片文件: {input_path}"
         orig_w, orig_h = img.size
         
-        if mode == 'width':
-            new_w = width
-            new_h = int(orig_h * (width / orig_w))
-        elif mode == 'height':
-            new_h = height
-            new_w = int(orig_w * (height / orig_h))
-        elif mode == 'fixed':
-            new_w, new_h = width, height
-        elif mode == 'percent':
-            new_w = int(orig_w * percent / 100)
-            new_h = int(orig_h * percent / 100)
-        else:
+        size = _target_size(orig_w, orig_h, mode, width, height, percent)
+        if size is None:
             return False, None, f"未知模式: {mode}"
+        new_w, new_h = size
         
-        resized = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
+        # 尺寸不变时直接写出原文件内容（此时只解析了文件头，不做解码和重新编码）
+        if (new_w, new_h) == (orig_w, orig_h) and not (palette and file_ext == 'png'):
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            return True, (new_w, new_h), None
         
-        file_ext = str(input_path).lower().split('.')[-1]
-        if file_ext in ['jpg', 'jpeg']:
-            resized.save(output_path, 'JPEG', quality=quality, optimize=True)
-        elif file_ext == 'png':
-            resized.save(output_path, 'PNG', optimize=True, compress_level=9)
+        # JPEG缩小2倍以上时，让解码器在DCT阶段直接按1/2~1/8缩小，减少解码量；
+        # 保留至少2倍目标尺寸，后续LANCZOS缩放的画质不受影响
+        # 宽高恰好都是目标的2/4/8倍时，DCT缩放直接得到目标尺寸，无需再做重采样
+        if img.format == 'JPEG' and new_w > 0 and new_h > 0 and max(orig_w / new_w, orig_h / new_h) >= 2:
+            if any(orig_w == new_w * k and orig_h == new_h * k for k in (2, 4, 8)):
+                img.draft(img.mode, (new_w, new_h))
+            else:
+                img.draft(img.mode, (new_w * 2, new_h * 2))
+        
+        if img.size == (new_w, new_h):
+            resized = img
         else:
-            resized.save(output_path)
+            # 等比例模式先用 reduce() 按整数倍快速缩小到目标的2倍以上，再用LANCZOS完成剩余缩放
+            # （与 Image.thumbnail 相同的做法，但尺寸仍按 _target_size 计算）
+            reducing_gap = None if mode == 'fixed' else 2.0
+            resized = img.resize((new_w, new_h), _LANCZOS, reducing_gap=reducing_gap)
+        
+        if save_args is None:
+            save_args = _save_args(file_ext, quality, png_level, progressive, optimize)
+        save_format, save_kwargs = save_args
+        if palette and save_format == 'PNG' and resized.mode in ('RGB', 'RGBA'):
+            resized = resized.quantize(colors=256, method=_QUANTIZE_METHOD)
+        # PNG优先交给 libpng 编码（调色板图片仍由PIL保存）
+        if not (save_format == 'PNG' and CV2_AVAILABLE and _save_png_cv2(resized, output_path, png_level)):
+            resized.save(output_path, save_format, **save_kwargs)
             
         return True, (new_w, new_h), None
         
@@ -72,8 +279,15 @@ def resize_image(input_path, output_path, mode, width=0, height=0, percent=0, qu
         return False, None, str(e)
 
 
+def _resize_worker(job):
+    """进程池任务：解包参数元组后调用 resize_image"""
+    return resize_image(*job)
+
+
 def batch_resize(input_folder, output_folder, mode, width=0, height=0, percent=0, 
-                group_mode=True, extensions=None, verbose=True):
+                group_mode=True, extensions=None, verbose=True, jobs=None, quality=95, png_level=6,
+                progressive=False, backend='pil', threads=False, skip_existing=False, palette=False,
+                optimize=False):
     """
     批量缩放文件夹中的图片
     
@@ -87,9 +301,20 @@ def batch_resize(input_folder, output_folder, mode, width=0, height=0, percent=0
         group_mode: 是否为分组模式（处理part1/part2子文件夹）
         extensions: 处理的扩展名列表（默认 ['.png', '.jpg', '.jpeg']）
         verbose: 是否打印进度
+        jobs: 并行进程数（默认CPU核心数，1为单进程顺序处理）
+        quality: JPEG质量（默认95）
+        png_level: PNG压缩级别0-9（默认6）
+        progressive: 是否保存为渐进式JPEG
+        backend: 缩放实现 ('pil', 'cv2')，默认pil
+        threads: 使用线程池代替进程池（PIL/cv2 在解码、缩放、编码时释放GIL，
+                 线程间可重叠磁盘I/O与计算，且无需跨进程传递参数，适合网络盘/慢速磁盘）
+        skip_existing: 跳过输出文件已存在、不早于源文件且尺寸与目标尺寸一致的图片
+                       （重复运行时只处理新增/修改的帧；格式和画质参数不做比较）
+        palette: PNG输出量化为256色调色板图片（有损）
+        optimize: JPEG输出是否做霍夫曼表优化
     
     返回:
-        dict: {'success': 成功数, 'fail': 失败数, 'errors': 错误列表, 'output_path': str}
+        dict: {'success': 成功数, 'fail': 失败数, 'skipped': 跳过数, 'errors': 错误列表, 'output_path': str}
     """
     if extensions is None:
         extensions = ['.png', '.jpg', '.jpeg']
@@ -105,15 +330,12 @@ def batch_resize(input_folder, output_folder, mode, width=0, height=0, percent=0
     # 收集文件
     if group_mode:
         part_dirs = []
-        for item in input_path.iterdir():
-            if item.is_dir() and re.match(r'^part\d+', item.name, re.IGNORECASE):
-                files = []
-                for ext in extensions:
-                    files.extend(item.glob(f"*{ext}"))
-                    files.extend(item.glob(f"*{ext.upper()}"))
-                if files:
-                    files = sorted(files, key=natural_sort_key)
-                    part_dirs.append((item, files))
+        with os.scandir(input_path) as entries:
+            for entry in entries:
+                if entry.is_dir() and _PART_RE.match(entry.name):
+                    files = scan_image_files(entry.path, extensions)
+                    if files:
+                        part_dirs.append((Path(entry.path), files))
         
         if not part_dirs:
             raise ValueError(f"未找到有效的 part* 子文件夹: {input_path}")
@@ -121,18 +343,15 @@ def batch_resize(input_folder, output_folder, mode, width=0, height=0, percent=0
         part_dirs.sort(key=lambda x: natural_sort_key(x[0].name))
         sources = part_dirs
     else:
-        files = []
-        for ext in extensions:
-            files.extend(input_path.glob(f"*{ext}"))
-            files.extend(input_path.glob(f"*{ext.upper()}"))
+        files = scan_image_files(input_path, extensions)
         if not files:
             raise ValueError(f"未找到图片文件: {input_path}")
-        files = sorted(files, key=natural_sort_key)
         sources = [(input_path, files)]
     
     # 处理
     total_success = 0
     total_fail = 0
+    total_skipped = 0
     errors = []
     
     desc = ""
@@ -150,47 +369,107 @@ def batch_resize(input_folder, output_folder, mode, width=0, height=0, percent=0
         print(f"🚀 开始批量处理 [{desc}]")
         print(f"📂 输入: {input_path}")
         print(f"📁 输出: {output_path}")
+        if PIL_AVAILABLE and not features.check_feature('libjpeg_turbo'):
+            print("⚠️  当前 Pillow 未使用 libjpeg-turbo，JPEG 编解码会较慢")
+        # 使用 opencv 缩放时不经过 PIL 的缩放路径，无需提示
+        if backend != 'cv2' and _pillow_simd_missing():
+            print("💡 安装 Pillow-SIMD 可将 LANCZOS 缩放加速数倍（SSE4/AVX2）：")
+            print("   pip uninstall -y Pillow && CC=\"cc -mavx2\" pip install pillow-simd")
         print(f"{'='*50}")
     
+    # 先建好输出目录并展开所有任务，再统一交给进程池（每张图片的缩放和编码互相独立）
+    # 任务中的路径都使用字符串，避免为每张图片创建 Path 对象
+    output_dir = os.fspath(output_path)
+    tasks = []
     for source_dir, img_files in sources:
         if group_mode:
-            rel_name = source_dir.name
-            current_output = output_path / rel_name
+            current_output = os.path.join(output_dir, source_dir.name)
         else:
-            current_output = output_path
+            current_output = output_dir
         
-        current_output.mkdir(parents=True, exist_ok=True)
-        
-        if verbose:
-            print(f"\n📦 {source_dir.name if group_mode else '处理中'} ({len(img_files)} 张)")
+        os.makedirs(current_output, exist_ok=True)
         
+        label = source_dir.name if group_mode else '处理中'
         for i, file_path in enumerate(img_files, 1):
-            output_file = current_output / file_path.name
-            
-            success, new_size, error = resize_image(
-                file_path, output_file, mode, width, height, percent
-            )
+            output_file = os.path.join(current_output, os.path.basename(file_path))
+            if skip_existing and _output_up_to_date(file_path, output_file, mode, width, height, percent):
+                total_skipped += 1
+                continue
+            tasks.append((label, i, len(img_files), file_path, output_file))
+    
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    
+    # 每种扩展名的保存参数只确定一次，随任务传入
+    save_table = {}
+    job_args = []
+    for _, _, _, file_path, output_file in tasks:
+        file_ext = os.path.splitext(file_path)[1][1:].lower()
+        if file_ext not in save_table:
+            save_table[file_ext] = _save_args(file_ext, quality, png_level, progressive, optimize)
+        job_args.append((file_path, output_file, mode, width, height, percent, quality, png_level,
+                         progressive, backend, save_table[file_ext], palette, optimize))
+    
+    if jobs > 1 and len(tasks) > 1:
+        executor = (ThreadPoolExecutor if threads else ProcessPoolExecutor)(max_workers=jobs)
+    else:
+        executor = None
+    try:
+        if executor is not None:
+            chunksize = max(1, min(16, len(job_args) // (jobs * 4)))
+            # chunksize 只对进程池有效，线程池会忽略
+            results = executor.map(_resize_worker, job_args, chunksize=chunksize)
+        else:
+            results = map(_resize_worker, job_args)
+        
+        # 每个分组本次实际处理的张数（已跳过的不计入进度）
+        part_totals = {}
+        for label, *_ in tasks:
+            part_totals[label] = part_totals.get(label, 0) + 1
+        
+        # map按提交顺序返回结果，输出顺序与顺序处理时一致；
+        # 进度条按时间节流刷新，失败信息在该分组完成后统一打印，不打断进度条
+        last_label = None
+        for (label, i, count, file_path, _), (success, new_size, error) in zip(tasks, results):
+            if label != last_label:
+                if verbose:
+                    print(f"\n📦 {label} ({count} 张)")
+                last_label = label
+                done = 0
+                part_errors = []
+                size_text = ""
+            done += 1
             
             if success:
                 total_success += 1
-                if verbose and (i % 10 == 0 or i == len(img_files)):
-                    print(f"  ✅ [{i}/{len(img_files)}] {file_path.name} → {new_size[0]}x{new_size[1]}")
+                size_text = f"→ {new_size[0]}x{new_size[1]}"
             else:
                 total_fail += 1
                 errors.append(f"{file_path}: {error}")
-                if verbose:
-                    print(f"  ❌ [{i}/{len(img_files)}] {file_path.name}: {error}")
+                part_errors.append(f"  ❌ [{i}/{count}] {os.path.basename(file_path)}: {error}")
+            
+            if verbose:
+                print_progress(done, part_totals[label], prefix="  处理中", suffix=size_text)
+                if done == part_totals[label]:
+                    for line in part_errors:
+                        print(line)
+    finally:
+        if executor is not None:
+            executor.shutdown()
     
     if verbose:
         print(f"\n{'='*50}")
         print("📊 处理完成!")
         print(f"   ✅ 成功: {total_success}")
         print(f"   ❌ 失败: {total_fail}")
+        if total_skipped:
+            print(f"   ⏭️  跳过: {total_skipped}")
         print(f"{'='*50}")
     
     return {
         'success': total_success,
         'fail': total_fail,
+        'skipped': total_skipped,
         'errors': errors,
         'output_path': str(output_path)
     }
@@ -216,6 +495,22 @@ def main():
                        help='非分组模式（不查找part1/part2子文件夹）')
     parser.add_argument('-q', '--quality', type=int, default=95,
                        help='JPEG质量（默认95）')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                       help='并行进程数（默认CPU核心数）')
+    parser.add_argument('--png-level', type=int, default=6, choices=range(10), metavar='0-9',
+                       help='PNG压缩级别（默认6）')
+    parser.add_argument('--progressive', action='store_true',
+                       help='保存为渐进式JPEG')
+    parser.add_argument('--backend', default='pil', choices=['pil', 'cv2'],
+                       help='缩放实现（默认pil，LANCZOS；cv2更快，缩小时使用INTER_AREA，画面比LANCZOS略柔和）')
+    parser.add_argument('--threads', action='store_true',
+                       help='使用线程池并行（慢速/网络磁盘上可重叠读写与计算）')
+    parser.add_argument('--skip-existing', action='store_true',
+                       help='跳过已存在、比源文件新且尺寸相同的输出文件（不比较格式/画质参数）')
+    parser.add_argument('--palette', action='store_true',
+                       help='PNG输出量化为256色调色板（有损，文件更小）')
+    parser.add_argument('--optimize', action='store_true',
+                       help='JPEG输出做霍夫曼表优化（体积略小，编码更慢）')
     
     args = parser.parse_args()
     
@@ -238,7 +533,16 @@ def main():
             height=h,
             percent=p,
             group_mode=not args.no_group,
-            verbose=True
+            verbose=True,
+            jobs=args.jobs,
+            quality=args.quality,
+            png_level=args.png_level,
+            progressive=args.progressive,
+            backend=args.backend,
+            threads=args.threads,
+            skip_existing=args.skip_existing,
+            palette=args.palette,
+            optimize=args.optimize
         )
         
         if result['fail'] > 0:
@@ -8,7 +8,9 @@
 
 import os
 import sys
-import glob
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain, islice
 
 try:
     from PIL import Image
@@ -16,16 +18,210 @@ try:
 except ImportError:
     PIL_AVAILABLE = False
 
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import natural_sort_key, format_value, pixel_to_hex, print_progress, print_progress_inline
+from utils import natural_sort_key, iglob_files, bytes_to_hex_colors, print_progress, print_progress_inline
 from config import (
-    get_adofai_settings,
+    get_adofai_settings_lines,
     DEFAULT_FPS, DEFAULT_ZOOM, ROW_OFFSET,
-    FRAME_START_Y_OFFSET, FRAME_GAP, FLOOR_WIDTH, FLOOR_HEIGHT
+    FRAME_START_Y_OFFSET, FRAME_GAP, FLOOR_WIDTH, FLOOR_HEIGHT,
+    WRITE_BUFFER_SIZE
 )
 
 
-def generate_video_adofai(frame_paths, output_path, fps=None, zoom=None, verbose=True):
+# v1 Director区MoveCamera事件模板：% (floor, camera_x, camera_y, zoom)
+MOVE_CAMERA_TMPL = '\t\t{ "floor": %d, "eventType": "MoveCamera", "duration": 0, "relativeTo": "Global", "position": [%s, %s], "zoom": %s, "angleOffset": 0, "ease": "Linear", "dontDisable": false, "minVfxOnly": false, "eventTag": ""}'
+
+# v1 ColorTrack事件模板（只有floor和颜色会变化）：% (floor, color)
+COLOR_TMPL = '\t\t{ "floor": %d, "eventType": "ColorTrack", "trackColorType": "Single", "trackColor": "%s", "secondaryTrackColor": "ffffff", "trackColorAnimDuration": 2, "trackColorPulse": "None", "trackPulseLength": 10, "trackStyle": "Minimal", "trackTexture": "", "trackTextureScale": 1, "trackGlowIntensity": 100, "justThisTile": false}'
+
+# v2 RecolorTrack事件模板（startTile/endTile为闭区间）：先 % angle 得到单帧模板，再 % (start, end, color)
+RECOLOR_TMPL = '\t\t{ "floor": 1, "eventType": "RecolorTrack", "startTile": [%%d, "Start"], "endTile": [%%d, "Start"], "gapLength": 0, "duration": 0, "trackColorType": "Single", "trackColor": "%%s", "secondaryTrackColor": "ffffff", "trackColorAnimDuration": 2, "trackColorPulse": "None", "trackPulseLength": 10, "trackStyle": "Basic", "trackGlowIntensity": 100, "angleOffset": %s, "ease": "Linear", "eventTag": ""}'
+
+
+def _position_template(x_offset, y_offset):
+    """生成偏移量已固定、只剩floor待填的 PositionTrack 事件模板：% floor"""
+    return ('\t\t{ "floor": %%d, "eventType": "PositionTrack", "positionOffset": [%s, %s], '
+            '"relativeTo": [0, "ThisTile"], "justThisTile": false, "editorOnly": false}') % (x_offset, y_offset)
+
+
+def _color_runs(pixel_indices, hex_colors, merge=True):
+    """
+    将像素序号按"序号连续且颜色相同"合并为区间
+    
+    参数:
+        pixel_indices: 递增的像素序号
+        hex_colors: 该帧的颜色字符串列表
+        merge: 为False时每个像素单独成一个区间
+    
+    返回:
+        生成器，产出 (起始序号, 结束序号, 颜色)，区间为闭区间
+    """
+    run_start = run_end = run_color = None
+    for pixel_idx in pixel_indices:
+        color = hex_colors[pixel_idx]
+        if merge and run_start is not None and pixel_idx == run_end + 1 and color == run_color:
+            run_end = pixel_idx
+            continue
+        if run_start is not None:
+            yield run_start, run_end, run_color
+        run_start = run_end = pixel_idx
+        run_color = color
+    if run_start is not None:
+        yield run_start, run_end, run_color
+
+
+def _check_frame_sizes(frame_paths, verbose=True):
+    """
+    检查所有帧尺寸是否一致（只读取图片头信息，不解码像素）
+    
+    参数:
+        frame_paths: 帧图片路径列表
+        verbose: 是否显示进度
+    
+    返回:
+        tuple: (width, height)
+    """
+    if verbose:
+        print(f"检查 {len(frame_paths)} 帧图片...")
+    
+    size = None
+    for i, path in enumerate(frame_paths):
+        with Image.open(path) as img:
+            if size is None:
+                size = img.size
+            elif img.size != size:
+                raise ValueError(f"帧 {i+1} 的尺寸 {img.size} 与第一帧 {size} 不一致")
+        if verbose:
+            print_progress(i + 1, len(frame_paths), prefix="  检查帧", suffix="")
+    
+    return size
+
+
+def _read_frame_bytes(path, mode='RGBA'):
+    """读取单帧并转换为指定模式（RGBA/RGB）的像素字节"""
+    with Image.open(path) as img:
+        if img.mode != mode:
+            img = img.convert(mode)
+        return img.tobytes()
+
+
+def _iter_frames(frame_paths, include_alpha=True, workers=None):
+    """
+    按顺序逐帧产出RGBA（include_alpha=False时为RGB）像素字节
+    后台线程池预读后续帧（PIL解码时释放GIL），主线程生成事件的同时解码下一批帧；
+    预读数量有上限，内存中只保留少量帧
+    
+    参数:
+        frame_paths: 帧图片路径列表
+        include_alpha: 是否保留alpha通道
+        workers: 解码线程数（默认CPU核心数）
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    max_pending = workers * 2
+    mode = 'RGBA' if include_alpha else 'RGB'
+    
+    paths = iter(frame_paths)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path in islice(paths, max_pending):
+            pending.append(pool.submit(_read_frame_bytes, path, mode))
+        while pending:
+            frame_bytes = pending.popleft().result()
+            path = next(paths, None)
+            if path is not None:
+                pending.append(pool.submit(_read_frame_bytes, path, mode))
+            yield frame_bytes
+
+
+def _build_frame_events(frame_bytes, channels, width, start_floor, pos_row, skip_repeated=True):
+    """
+    生成v1单帧中第2个像素起的ColorTrack/PositionTrack事件文本
+    （第1个像素的事件依赖上一帧末尾的颜色和帧起始偏移，由调用方写出）
+    
+    参数:
+        frame_bytes: 该帧的像素字节
+        channels: 每像素字节数
+        width: 帧宽度
+        start_floor: 该帧第1个像素所在的floor
+        pos_row: 换行PositionTrack模板
+        skip_repeated: 颜色与前一个砖块相同时不生成ColorTrack
+    
+    返回:
+        tuple: (首像素颜色, 帧末轨道颜色, 事件文本的UTF-8字节, 事件数)
+    """
+    hex_colors = bytes_to_hex_colors(frame_bytes, channels)
+    prev_color = hex_colors[0]
+    events = []
+    
+    for pixel_idx in range(1, len(hex_colors)):
+        floor = start_floor + pixel_idx
+        color = hex_colors[pixel_idx]
+        if color != prev_color or not skip_repeated:
+            events.append(COLOR_TMPL % (floor, color))
+            prev_color = color
+        if pixel_idx % width == 0:
+            events.append(pos_row % floor)
+    
+    return hex_colors[0], prev_color, ",\n".join(events).encode(), len(events)
+
+
+def _build_frame_events_from_path(path, mode, width, start_floor, pos_row, skip_repeated):
+    """进程池任务：在子进程中读取帧并生成事件文本（只传路径，避免序列化像素数据）"""
+    return _build_frame_events(_read_frame_bytes(path, mode), len(mode), width,
+                               start_floor, pos_row, skip_repeated)
+
+
+def _iter_frame_events(frame_paths, include_alpha, width, first_floor, pixels_per_frame, pos_row,
+                       skip_repeated=True, workers=1):
+    """
+    按顺序逐帧产出 _build_frame_events 的结果
+    workers>1 时由进程池并行读取帧并格式化事件（格式化是纯Python循环，受GIL限制无法用线程加速）；
+    提交数量有上限，内存中只保留少量帧的事件文本
+    
+    参数:
+        frame_paths: 帧图片路径列表
+        include_alpha: 是否保留alpha通道
+        width: 帧宽度
+        first_floor: 第一帧第1个像素所在的floor
+        pixels_per_frame: 每帧像素数
+        pos_row: 换行PositionTrack模板
+        skip_repeated: 颜色与前一个砖块相同时不生成ColorTrack
+        workers: 进程数（默认1，在当前进程内逐帧生成；None为CPU核心数）
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    mode = 'RGBA' if include_alpha else 'RGB'
+    
+    if workers <= 1 or len(frame_paths) <= 1:
+        for frame_idx, frame_bytes in enumerate(_iter_frames(frame_paths, include_alpha)):
+            yield _build_frame_events(frame_bytes, len(mode), width,
+                                      first_floor + frame_idx * pixels_per_frame, pos_row, skip_repeated)
+        return
+    
+    max_pending = workers * 2
+    jobs = ((path, mode, width, first_floor + frame_idx * pixels_per_frame, pos_row, skip_repeated)
+            for frame_idx, path in enumerate(frame_paths))
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for job in islice(jobs, max_pending):
+            pending.append(pool.submit(_build_frame_events_from_path, *job))
+        while pending:
+            result = pending.popleft().result()
+            job = next(jobs, None)
+            if job is not None:
+                pending.append(pool.submit(_build_frame_events_from_path, *job))
+            yield result
+
+
+def generate_video_adofai(frame_paths, output_path, fps=None, zoom=None, verbose=True, include_alpha=False,
+                          skip_repeated=True, workers=1):
     """
     将视频帧序列转换为ADOFAI关卡文件（v1 ColorTrack方案）
     
@@ -35,6 +231,10 @@ def generate_video_adofai(frame_paths, output_path, fps=None, zoom=None, verbose
         fps: 帧率（默认从config读取）
         zoom: 缩放百分比（默认从config读取）
         verbose: 是否显示详细信息
+        include_alpha: 颜色是否包含alpha（默认否，输出6位"rrggbb"，帧图片一般没有透明度）
+        skip_repeated: 颜色与前一个砖块相同时不生成ColorTrack（ColorTrack对后续砖块持续生效，画面不变）
+        workers: 生成Frame区事件的进程数（默认1，单进程；进程池有启动开销，且spawn方式会在每个子进程重新导入主模块，
+                 帧数多、CPU核心多时再显式指定，None为CPU核心数）
     
     返回:
         bool: 是否成功
@@ -48,25 +248,10 @@ def generate_video_adofai(frame_paths, output_path, fps=None, zoom=None, verbose
         zoom = DEFAULT_ZOOM
     
     try:
-        # 读取所有帧
-        if verbose:
-            print(f"读取 {len(frame_paths)} 帧图片...")
-        frames = []
-        for i, path in enumerate(frame_paths):
-            img = Image.open(path)
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
-            frames.append(img)
-            if verbose:
-                print_progress(i + 1, len(frame_paths), prefix="  读取帧", suffix="")
+        # 先检查尺寸，像素在生成时逐帧读取
+        width, height = _check_frame_sizes(frame_paths, verbose)
         
-        # 检查所有帧尺寸是否一致
-        width, height = frames[0].size
-        for i, frame in enumerate(frames[1:], 1):
-            if frame.size != (width, height):
-                raise ValueError(f"帧 {i+1} 的尺寸 {frame.size} 与第一帧 {(width, height)} 不一致")
-        
-        num_frames = len(frames)
+        num_frames = len(frame_paths)
         pixels_per_frame = width * height
         
         # 计算BPM
@@ -88,20 +273,11 @@ def generate_video_adofai(frame_paths, output_path, fps=None, zoom=None, verbose
             print(f"  Frame区: {num_frames * pixels_per_frame} 个Floor")
             print(f"  总Floor数: {total_floors}")
         
-        # 开始生成
-        lines = []
-        lines.append("{")
-        
         # angleData
         angle_count = total_floors - 1
-        angles = ", ".join(["0"] * angle_count)
-        lines.append(f'\t"angleData": [{angles}], ')
-        
-        # settings
-        lines.append('\t"settings":')
-        lines.append('\t{')
+        angles = "0" + ", 0" * (angle_count - 1) if angle_count else ""
         
-        settings = get_adofai_settings(
+        settings_lines = get_adofai_settings_lines(
             level_desc=f"Video {width}×{height} {fps}FPS {num_frames}frames",
             level_tags="video",
             bpm=bpm,
@@ -109,116 +285,110 @@ def generate_video_adofai(frame_paths, output_path, fps=None, zoom=None, verbose
             track_color="000000"
         )
         
-        for i, (key, val) in enumerate(settings):
-            comma = "," if i < len(settings) - 1 else ""
-            lines.append(f'\t\t"{key}": {format_value(val)}{comma}')
-        
-        lines.append('\t},')
-        
-        # actions
-        lines.append('\t"actions":')
-        lines.append('\t[')
-        
-        actions = []
-        
         if verbose:
-            print("\n生成Director区...")
+            print(f"\n写入文件: {output_path}")
         
-        # Director区: Floor 1 到 Floor num_frames
-        for frame_idx in range(num_frames):
-            floor = frame_idx + 1
+        # 边生成边写入：Director区和Frame区各按floor顺序输出，无需收集后再排序
+        with open(output_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(b"{\n")
+            f.write(f'\t"angleData": [{angles}], \n'.encode())
+            
+            # settings
+            f.write(b'\t"settings":\n')
+            f.write(b'\t{\n')
+            
+            f.write(",\n".join(settings_lines).encode('utf-8'))
+            f.write(b"\n")
+            
+            f.write(b'\t},\n')
             
-            frame_y_start = FRAME_START_Y_OFFSET - frame_idx * (height * FLOOR_HEIGHT + FRAME_GAP)
+            # actions
+            f.write(b'\t"actions":\n')
+            f.write(b'\t[\n')
+            
+            action_count = 0
+            sep = b""
+            
+            if verbose:
+                print("\n生成Director区...")
+            
+            # Director区: Floor 1 到 Floor num_frames
+            # 镜头位置是帧序号的闭式表达式：x固定，y按等差递减
             camera_x = width / 2
-            camera_y = frame_y_start - (height * FLOOR_HEIGHT) / 2
+            frame_step = height * FLOOR_HEIGHT + FRAME_GAP
+            half_height = (height * FLOOR_HEIGHT) / 2
+            camera_ys = [FRAME_START_Y_OFFSET - frame_idx * frame_step - half_height
+                         for frame_idx in range(num_frames)]
             
-            move_camera = (floor, f'\t\t{{ "floor": {floor}, "eventType": "MoveCamera", "duration": 0, "relativeTo": "Global", "position": [{camera_x}, {camera_y}], "zoom": {zoom}, "angleOffset": 0, "ease": "Linear", "dontDisable": false, "minVfxOnly": false, "eventTag": ""}}')
-            actions.append(move_camera)
+            f.write(sep)
+            f.write(",\n".join([MOVE_CAMERA_TMPL % (frame_idx + 1, camera_x, camera_y, zoom)
+                                 for frame_idx, camera_y in enumerate(camera_ys)]).encode())
+            sep = b",\n"
+            action_count += num_frames
             
-            if verbose and ((frame_idx + 1) % 10 == 0 or frame_idx == num_frames - 1):
-                print(f"  Director Floor {floor}: 帧{frame_idx+1} 中心=({camera_x:.1f}, {camera_y:.1f})")
-        
-        if verbose:
-            print("\n生成Frame区...")
-        
-        # Frame区: 从 Floor (num_frames + 1) 开始
-        current_floor = num_frames + 1
-        total_pixels = num_frames * pixels_per_frame
-        processed_pixels = 0
-        
-        for frame_idx in range(num_frames):
-            pixels = list(frames[frame_idx].getdata())
+            if verbose:
+                # 镜头位置是等差数列，只输出首尾，避免长视频逐帧打印拖慢终端
+                print(f"  Director Floor 1-{num_frames}: 中心x={camera_x:.1f}, "
+                      f"y={camera_ys[0]:.1f} → {camera_ys[-1]:.1f}（每帧 -{frame_step:g}）")
+            
+            if verbose:
+                print("\n生成Frame区...")
+            
+            # Frame区: 从 Floor (num_frames + 1) 开始
+            current_floor = num_frames + 1
+            total_pixels = num_frames * pixels_per_frame
+            processed_pixels = 0
             
-            for pixel_idx in range(pixels_per_frame):
+            # PositionTrack只有三种固定偏移，预先生成模板，循环中只填floor
+            pos_first = _position_template(-(num_frames + 1), FRAME_START_Y_OFFSET)
+            pos_frame = _position_template(-width, -(ROW_OFFSET + FRAME_GAP))
+            pos_row = _position_template(-width, -ROW_OFFSET)
+            
+            # 上一个ColorTrack的颜色（跨帧延续，Frame区的砖块是连续的）
+            prev_color = None
+            
+            frame_events = _iter_frame_events(frame_paths, include_alpha, width, current_floor, pixels_per_frame,
+                                              pos_row, skip_repeated, workers)
+            for frame_idx, (first_color, last_color, events, event_count) in enumerate(frame_events):
                 floor = current_floor
-                current_floor += 1
-                processed_pixels += 1
-                
-                hex_color = pixel_to_hex(*pixels[pixel_idx])
-                
-                # ColorTrack事件
-                color_action = (floor, f'\t\t{{ "floor": {floor}, "eventType": "ColorTrack", "trackColorType": "Single", "trackColor": "{hex_color}", "secondaryTrackColor": "ffffff", "trackColorAnimDuration": 2, "trackColorPulse": "None", "trackPulseLength": 10, "trackStyle": "Minimal", "trackTexture": "", "trackTextureScale": 1, "trackGlowIntensity": 100, "justThisTile": false}}')
-                actions.append(color_action)
+                current_floor += pixels_per_frame
+                processed_pixels += pixels_per_frame
                 
-                # PositionTrack逻辑
-                if frame_idx == 0 and pixel_idx == 0:
-                    x_offset = -(num_frames + 1)
-                    y_offset = FRAME_START_Y_OFFSET
-                    pos_action = (floor, f'\t\t{{ "floor": {floor}, "eventType": "PositionTrack", "positionOffset": [{x_offset}, {y_offset}], "relativeTo": [0, "ThisTile"], "justThisTile": false, "editorOnly": false}}')
-                    actions.append(pos_action)
+                # 每帧第1个像素：ColorTrack取决于上一帧末尾的轨道颜色，PositionTrack为帧起始偏移
+                if first_color != prev_color or not skip_repeated:
+                    f.write(sep)
+                    f.write((COLOR_TMPL % (floor, first_color)).encode())
+                    action_count += 1
+                f.write(sep)
+                f.write(((pos_first if frame_idx == 0 else pos_frame) % floor).encode())
+                action_count += 1
+                prev_color = last_color
                 
-                elif pixel_idx == 0 and frame_idx > 0:
-                    x_offset = -width
-                    y_offset = -(ROW_OFFSET + FRAME_GAP)
-                    pos_action = (floor, f'\t\t{{ "floor": {floor}, "eventType": "PositionTrack", "positionOffset": [{x_offset}, {y_offset}], "relativeTo": [0, "ThisTile"], "justThisTile": false, "editorOnly": false}}')
-                    actions.append(pos_action)
+                # 其余像素的事件
+                if event_count:
+                    f.write(sep)
+                    f.write(events)
+                    action_count += event_count
                 
-                else:
-                    col = pixel_idx % width
-                    
-                    if col == 0 and pixel_idx > 0:
-                        x_offset = -width
-                        y_offset = -ROW_OFFSET
-                        pos_action = (floor, f'\t\t{{ "floor": {floor}, "eventType": "PositionTrack", "positionOffset": [{x_offset}, {y_offset}], "relativeTo": [0, "ThisTile"], "justThisTile": false, "editorOnly": false}}')
-                        actions.append(pos_action)
+                # 每帧结束后更新进度
+                if verbose:
+                    print_progress(processed_pixels, total_pixels, prefix="  生成像素", suffix=f"帧{frame_idx+1}/{num_frames}")
             
-            # 每帧结束后更新进度
-            if verbose:
-                print_progress(processed_pixels, total_pixels, prefix="  生成像素", suffix=f"帧{frame_idx+1}/{num_frames}")
-        
-        # 按floor编号排序
-        actions.sort(key=lambda x: x[0])
-        
-        if verbose:
-            print("\n写入actions...")
-        
-        for i, (_, action_str) in enumerate(actions):
-            if i < len(actions) - 1:
-                lines.append(action_str + ",")
-            else:
-                lines.append(action_str)
-        
-        lines.append('\t],')
-        
-        # decorations
-        lines.append('\t"decorations":')
-        lines.append('\t[')
-        lines.append('\t]')
-        
-        lines.append("}")
-        
-        # 写入文件
-        if verbose:
-            print(f"\n写入文件: {output_path}")
-        
-        content = "\n".join(lines)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+            if action_count:
+                f.write(b"\n")
+            f.write(b'\t],\n')
+            
+            # decorations
+            f.write(b'\t"decorations":\n')
+            f.write(b'\t[\n')
+            f.write(b'\t]\n')
+            
+            f.write(b"}")
         
         if verbose:
             print(f"\n✓ 成功生成 ADOFAI 视频关卡!")
             print(f"  输出文件: {output_path}")
-            print(f"  总事件数: {len(actions)}")
+            print(f"  总事件数: {action_count}")
         
         return True
         
@@ -232,184 +402,374 @@ def generate_video_adofai(frame_paths, output_path, fps=None, zoom=None, verbose
         return False
 
 
-def generate_video_adofai_v2(frame_paths, output_path, fps=None, zoom=None, verbose=True):
+# v2 BPM固定为60
+V2_BPM = 60
+
+
+def _v2_angle_step(fps):
+    """v2相邻两帧之间的角度间隔：d = 3 × BPM / fps"""
+    return 3 * V2_BPM / fps
+
+
+def _build_recolor_events(frame_bytes, prev_bytes, prev_colors, channels, frame_tmpl,
+                          skip_unchanged=True, merge_runs=True):
     """
-    使用RecolorTrack方案生成视频ADOFAI（v2高效版本）
+    生成v2单帧的RecolorTrack事件
+    
+    参数:
+        frame_bytes: 该帧的像素字节
+        prev_bytes: 上一帧的像素字节（第一帧或不跳过未变化像素时为None）
+        prev_colors: 上一帧的颜色字符串列表（为None时按需由prev_bytes转换）
+        channels: 每像素字节数
+        frame_tmpl: 已填入该帧角度偏移的RecolorTrack模板
+        skip_unchanged: 是否跳过与上一帧颜色相同的像素
+        merge_runs: 是否将连续同色的像素合并为一个区间
+    
+    返回:
+        tuple: (事件文本的UTF-8字节, 事件数, 该帧的颜色字符串列表)
+    """
+    if skip_unchanged and frame_bytes == prev_bytes:
+        # 整帧与上一帧相同，无需重新着色
+        return b"", 0, prev_colors
+    
+    hex_colors = bytes_to_hex_colors(frame_bytes, channels)
+    if skip_unchanged and prev_bytes is not None:
+        if prev_colors is None:
+            prev_colors = bytes_to_hex_colors(prev_bytes, channels)
+        # 只为颜色发生变化的像素生成RecolorTrack
+        changed = [i for i, (cur, prev) in enumerate(zip(hex_colors, prev_colors)) if cur != prev]
+    else:
+        changed = range(len(hex_colors))
+    
+    # 相邻同色像素合并为一个 [startTile, endTile] 区间事件（砖块序号 = 像素序号 + 1）
+    events = [frame_tmpl % (run_start + 1, run_end + 1, hex_color)
+              for run_start, run_end, hex_color in _color_runs(changed, hex_colors, merge_runs)]
+    return ",\n".join(events).encode(), len(events), hex_colors
+
+
+def _build_recolor_events_job(frame_bytes, prev_bytes, channels, frame_tmpl, skip_unchanged, merge_runs):
+    """进程池任务：由主进程传入该帧和上一帧的像素字节，只返回事件字节和数量（颜色列表不回传）"""
+    events, count, _ = _build_recolor_events(frame_bytes, prev_bytes, None, channels, frame_tmpl,
+                                             skip_unchanged, merge_runs)
+    return events, count
+
+
+def _iter_recolor_events(frames, fps, channels=4, skip_unchanged=True, merge_runs=True):
+    """
+    按顺序逐帧产出 (事件字节, 事件数)
+    
+    参数:
+        frames: 按顺序产出每帧像素字节的可迭代对象
+        fps: 帧率
+        channels: 每像素字节数
+        skip_unchanged: 是否跳过与上一帧颜色相同的像素
+        merge_runs: 是否将连续同色的像素合并为一个区间
+    """
+    d = _v2_angle_step(fps)
+    prev_bytes = None
+    prev_colors = None
+    for frame_idx, frame_bytes in enumerate(frames):
+        events, count, prev_colors = _build_recolor_events(
+            frame_bytes, prev_bytes, prev_colors, channels, RECOLOR_TMPL % (frame_idx * d),
+            skip_unchanged, merge_runs)
+        if skip_unchanged:
+            prev_bytes = frame_bytes
+        yield events, count
+
+
+def _iter_recolor_events_from_paths(frame_paths, fps, include_alpha=False, skip_unchanged=True,
+                                    merge_runs=True, workers=1):
+    """
+    从帧图片按顺序逐帧产出 (事件字节, 事件数)
+    workers>1 时由进程池并行生成：每帧只在主进程解码一次（后台线程预读），
+    该帧与上一帧的像素字节一起交给子进程，帧之间互不依赖；
+    提交数量有上限，内存中只保留少量帧的事件
     
     参数:
         frame_paths: 帧图片路径列表
+        fps: 帧率
+        include_alpha: 是否保留alpha通道
+        skip_unchanged: 是否跳过与上一帧颜色相同的像素
+        merge_runs: 是否将连续同色的像素合并为一个区间
+        workers: 进程数（默认1，在当前进程内逐帧生成；None为CPU核心数）
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    channels = 4 if include_alpha else 3
+    frames = _iter_frames(frame_paths, include_alpha)
+    
+    if workers <= 1 or len(frame_paths) <= 1:
+        yield from _iter_recolor_events(frames, fps, channels, skip_unchanged, merge_runs)
+        return
+    
+    d = _v2_angle_step(fps)
+    
+    def iter_jobs():
+        prev_bytes = None
+        for frame_idx, frame_bytes in enumerate(frames):
+            yield (frame_bytes, prev_bytes, channels, RECOLOR_TMPL % (frame_idx * d),
+                   skip_unchanged, merge_runs)
+            if skip_unchanged:
+                prev_bytes = frame_bytes
+    
+    max_pending = workers * 2
+    jobs = iter_jobs()
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for job in islice(jobs, max_pending):
+            pending.append(pool.submit(_build_recolor_events_job, *job))
+        while pending:
+            result = pending.popleft().result()
+            job = next(jobs, None)
+            if job is not None:
+                pending.append(pool.submit(_build_recolor_events_job, *job))
+            yield result
+
+
+def _write_video_adofai_v2(frame_events, output_path, width, height, num_frames, fps, zoom, verbose=True):
+    """
+    按v2 RecolorTrack方案写出关卡（帧来源无关）
+    
+    参数:
+        frame_events: 按顺序产出每帧 (RecolorTrack事件字节, 事件数) 的可迭代对象
         output_path: 输出.adofai文件路径
-        fps: 帧率（默认从config读取）
-        zoom: 缩放百分比（默认从config读取）
+        width, height: 帧尺寸
+        num_frames: 帧数（用于显示信息和进度，未知时为0）
+        fps: 帧率
+        zoom: 缩放百分比
         verbose: 是否显示详细信息
-    
-    返回:
-        bool: 是否成功
     """
-    if not PIL_AVAILABLE:
-        raise ImportError("需要安装 Pillow: pip install Pillow")
+    pixels_per_frame = width * height
+    position_value = [width / 2, -height / 2]
     
-    if fps is None:
-        fps = DEFAULT_FPS
-    if zoom is None:
-        zoom = DEFAULT_ZOOM
+    bpm = V2_BPM
+    d = _v2_angle_step(fps)
     
-    try:
-        # 读取所有帧
-        if verbose:
-            print(f"读取 {len(frame_paths)} 帧图片...")
-        frames = []
-        for i, path in enumerate(frame_paths):
-            img = Image.open(path)
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
-            frames.append(img)
-            if verbose:
-                print_progress(i + 1, len(frame_paths), prefix="  读取帧", suffix="")
-        
-        # 检查所有帧尺寸是否一致
-        width, height = frames[0].size
-        for i, frame in enumerate(frames[1:], 1):
-            if frame.size != (width, height):
-                raise ValueError(f"帧 {i+1} 的尺寸 {frame.size} 与第一帧 {(width, height)} 不一致")
-        
-        num_frames = len(frames)
-        pixels_per_frame = width * height
-        position_value = [width / 2, -height / 2]
-        
-        # BPM固定为60
-        bpm = 60
-        
-        # 角度间隔公式：d = 3 × BPM / fps
-        d = 3 * bpm / fps
-        
-        if verbose:
-            print(f"\n视频信息:")
-            print(f"  帧数: {num_frames}")
-            print(f"  分辨率: {width}×{height}")
-            print(f"  每帧像素: {pixels_per_frame}")
-            print(f"  FPS: {fps}")
-            print(f"  BPM: {bpm} (固定)")
-            print(f"  角度间隔 d: {d}")
-            print(f"  Zoom: {zoom}%")
-        
-        # 砖块数 = 一帧的像素数
-        total_floors = pixels_per_frame
-        
-        if verbose:
-            print(f"\n关卡统计:")
-            print(f"  砖块数: {total_floors}")
-            print(f"  RecolorTrack数量: {num_frames} × {pixels_per_frame} = {num_frames * pixels_per_frame}")
-        
-        # 开始生成
-        lines = []
-        lines.append("{")
-        
-        # angleData: 全0
-        angles = ", ".join(["0"] * total_floors)
-        lines.append(f'\t"angleData": [{angles}], ')
+    if verbose:
+        print(f"\n视频信息:")
+        print(f"  帧数: {num_frames}")
+        print(f"  分辨率: {width}×{height}")
+        print(f"  每帧像素: {pixels_per_frame}")
+        print(f"  FPS: {fps}")
+        print(f"  BPM: {bpm} (固定)")
+        print(f"  角度间隔 d: {d}")
+        print(f"  Zoom: {zoom}%")
+    
+    # 砖块数 = 一帧的像素数
+    total_floors = pixels_per_frame
+    
+    if verbose:
+        print(f"\n关卡统计:")
+        print(f"  砖块数: {total_floors}")
+    
+    settings_lines = get_adofai_settings_lines(
+        level_desc="Video",
+        level_tags="video",
+        bpm=bpm,
+        zoom=zoom,
+        track_color="000000",
+        position=position_value,
+        relative_to="Global"
+    )
+    
+    # angleData: 全0
+    angles = "0" + ", 0" * (total_floors - 1) if total_floors else ""
+    
+    if verbose:
+        print(f"\n写入文件: {output_path}")
+    
+    # 边生成边写入：RecolorTrack都在Floor 1上，按帧顺序生成后直接写出，不在内存中累积全部事件
+    with open(output_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(b"{\n")
+        f.write(f'\t"angleData": [{angles}], \n'.encode())
         
         # settings
-        lines.append('\t"settings":')
-        lines.append('\t{')
-        
-        settings = get_adofai_settings(
-            level_desc="Video",
-            level_tags="video",
-            bpm=bpm,
-            zoom=zoom,
-            track_color="000000",
-            position=position_value,
-            relative_to="Global"
-        )
-        
-        for i, (key, val) in enumerate(settings):
-            comma = "," if i < len(settings) - 1 else ""
-            lines.append(f'\t\t"{key}": {format_value(val)}{comma}')
-        
-        lines.append('\t},')
+        f.write(b'\t"settings":\n')
+        f.write(b'\t{\n')
+        f.write(",\n".join(settings_lines).encode('utf-8'))
+        f.write(b"\n")
+        f.write(b'\t},\n')
         
         # actions
-        lines.append('\t"actions":')
-        lines.append('\t[')
+        f.write(b'\t"actions":\n')
+        f.write(b'\t[\n')
         
         if verbose:
             print("\n生成RecolorTrack...")
         
-        # 收集Floor 1的RecolorTrack
-        floor1_actions = []
+        recolor_count = 0
+        sep = b""
         total_recolor = num_frames * pixels_per_frame
         
-        for frame_idx in range(num_frames):
-            angle_offset = frame_idx * d
-            pixels = list(frames[frame_idx].getdata())
-            
-            for pixel_idx in range(pixels_per_frame):
-                tile_index = pixel_idx + 1
-                hex_color = pixel_to_hex(*pixels[pixel_idx])
-                
-                floor1_actions.append(f'\t\t{{ "floor": 1, "eventType": "RecolorTrack", "startTile": [{tile_index}, "Start"], "endTile": [{tile_index}, "Start"], "gapLength": 0, "duration": 0, "trackColorType": "Single", "trackColor": "{hex_color}", "secondaryTrackColor": "ffffff", "trackColorAnimDuration": 2, "trackColorPulse": "None", "trackPulseLength": 10, "trackStyle": "Basic", "trackGlowIntensity": 100, "angleOffset": {angle_offset}, "ease": "Linear", "eventTag": ""}}')
+        for frame_idx, (events, event_count) in enumerate(frame_events):
+            if event_count:
+                f.write(sep)
+                f.write(events)
+                sep = b",\n"
+                recolor_count += event_count
             
             # 每帧结束后更新进度
-            if verbose:
+            if verbose and num_frames:
                 current_count = (frame_idx + 1) * pixels_per_frame
                 print_progress(current_count, total_recolor, prefix="  生成RecolorTrack", suffix=f"帧{frame_idx+1}/{num_frames}")
         
         if verbose:
             print("\n生成PositionTrack（换行）...")
         
-        # 收集其他Floor的PositionTrack
-        other_actions = {}
+        # 其他Floor的PositionTrack：每行第1个砖块（最后一个砖块除外），按floor顺序写出
+        pos_row = _position_template(-width, -ROW_OFFSET)
+        position_actions = [pos_row % floor for floor in range(width + 1, total_floors, width)]
+        if position_actions:
+            f.write(sep)
+            f.write(",\n".join(position_actions).encode())
+            sep = b",\n"
+        if sep:
+            f.write(b"\n")
+        
+        # 写入结尾
+        f.write(b'\t],\n')
+        f.write(b'\t"decorations":\n')
+        f.write(b'\t[\n')
+        f.write(b'\t]\n')
+        f.write(b"}")
+    
+    if verbose:
+        print(f"\n✓ 成功生成 ADOFAI 视频关卡!")
+        print(f"  输出文件: {output_path}")
+        print(f"  砖块数: {total_floors}")
+        print(f"  RecolorTrack数: {recolor_count}")
+        print(f"  PositionTrack数: {len(position_actions)}")
+        print(f"  总事件数: {recolor_count + len(position_actions)}")
+
+
+def generate_video_adofai_v2(frame_paths, output_path, fps=None, zoom=None, verbose=True, skip_unchanged=True,
+                             merge_runs=True, include_alpha=False, workers=1):
+    """
+    使用RecolorTrack方案生成视频ADOFAI（v2高效版本）
+    
+    参数:
+        frame_paths: 帧图片路径列表
+        output_path: 输出.adofai文件路径
+        fps: 帧率（默认从config读取）
+        zoom: 缩放百分比（默认从config读取）
+        verbose: 是否显示详细信息
+        skip_unchanged: 是否跳过与上一帧颜色相同的像素（默认跳过）
+        merge_runs: 是否合并连续同色像素为区间事件（默认合并）
+        include_alpha: 颜色是否包含alpha（默认否，输出6位"rrggbb"，帧图片一般没有透明度）
+        workers: 生成事件的进程数（默认1，单进程；None为CPU核心数）
+    
+    返回:
+        bool: 是否成功
+    """
+    if not PIL_AVAILABLE:
+        raise ImportError("需要安装 Pillow: pip install Pillow")
+    
+    if fps is None:
+        fps = DEFAULT_FPS
+    if zoom is None:
+        zoom = DEFAULT_ZOOM
+    
+    try:
+        # 先检查尺寸，像素在生成时逐帧读取
+        width, height = _check_frame_sizes(frame_paths, verbose)
+        
+        frame_events = _iter_recolor_events_from_paths(frame_paths, fps, include_alpha, skip_unchanged,
+                                                       merge_runs, workers)
+        _write_video_adofai_v2(frame_events, output_path, width, height, len(frame_paths), fps, zoom, verbose)
         
-        for floor in range(2, total_floors + 1):
-            pixel_idx = floor - 1
-            col = pixel_idx % width
-            
-            if col == 0 and floor < total_floors:
-                x_offset = -width
-                y_offset = -ROW_OFFSET
-                other_actions[floor] = f'\t\t{{ "floor": {floor}, "eventType": "PositionTrack", "positionOffset": [{x_offset}, {y_offset}], "relativeTo": [0, "ThisTile"], "justThisTile": false, "editorOnly": false}}'
+        return True
         
-        if verbose:
-            print(f"\n写入文件: {output_path}")
-            print(f"  RecolorTrack数: {len(floor1_actions)}")
-            print(f"  PositionTrack数: {len(other_actions)}")
+    except Exception as e:
+        print(f"错误: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def _iter_video_frames(cap, size=None, include_alpha=False):
+    """
+    从 cv2.VideoCapture 逐帧解码，转换为RGB（include_alpha=True时为RGBA）像素字节
+    
+    参数:
+        cap: 已打开的 cv2.VideoCapture
+        size: 目标尺寸 (width, height)，None时保持原尺寸
+        include_alpha: 是否补上alpha通道（视频解码结果没有透明度，恒为ff）
+    """
+    conversion = cv2.COLOR_BGR2RGBA if include_alpha else cv2.COLOR_BGR2RGB
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if size is not None:
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        yield cv2.cvtColor(frame, conversion).tobytes()
+
+
+def generate_video_adofai_from_video(video_path, output_path, fps=None, zoom=None, size=None, verbose=True,
+                                     skip_unchanged=True, merge_runs=True, include_alpha=False):
+    """
+    直接从视频文件生成v2 RecolorTrack关卡，解码后的帧直接送入生成器，
+    不经过中间帧图片的写出和读回
+    
+    参数:
+        video_path: 视频文件路径
+        output_path: 输出.adofai文件路径
+        fps: 帧率（默认使用视频自身帧率，读取失败时从config读取）
+        zoom: 缩放百分比（默认从config读取）
+        size: 缩放后的帧尺寸 (width, height)，None时保持视频原尺寸
+        verbose: 是否显示详细信息
+        skip_unchanged: 是否跳过与上一帧颜色相同的像素（默认跳过）
+        merge_runs: 是否合并连续同色像素为区间事件（默认合并）
+        include_alpha: 颜色是否包含alpha（默认否，输出6位"rrggbb"，帧图片一般没有透明度）
+    
+    返回:
+        bool: 是否成功
+    """
+    if not CV2_AVAILABLE:
+        raise ImportError("需要安装 opencv-python: pip install opencv-python")
+    
+    if zoom is None:
+        zoom = DEFAULT_ZOOM
+    
+    if fps is not None and not fps > 0:
+        print(f"错误: 帧率必须大于0: {fps}")
+        return False
+    
+    if not os.path.exists(video_path):
+        print(f"错误: 找不到文件 '{video_path}'")
+        return False
+    
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            print("错误: 无法打开视频文件")
+            return False
+        
+        if fps is None:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            if not fps > 0:
+                # 部分容器不提供帧率（读取结果为0或NaN）
+                fps = DEFAULT_FPS
+        
+        if size is None:
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        else:
+            width, height = size
         
-        # 直接写入文件（流式写入）
-        with open(output_path, 'w', encoding='utf-8') as f:
-            # 写入前面部分
-            f.write("\n".join(lines))
-            f.write("\n")
-            
-            # 写入Floor 1的所有RecolorTrack
-            for i, action in enumerate(floor1_actions):
-                f.write(action)
-                if i < len(floor1_actions) - 1 or other_actions:
-                    f.write(",\n")
-                else:
-                    f.write("\n")
-            
-            # 写入其他Floor的PositionTrack（按floor排序）
-            sorted_floors = sorted(other_actions.keys())
-            for i, floor in enumerate(sorted_floors):
-                f.write(other_actions[floor])
-                if i < len(sorted_floors) - 1:
-                    f.write(",\n")
-                else:
-                    f.write("\n")
-            
-            # 写入结尾
-            f.write('\t],\n')
-            f.write('\t"decorations":\n')
-            f.write('\t[\n')
-            f.write('\t]\n')
-            f.write("}")
+        # 元数据中的帧数只用于显示进度，v2的砖块数只取决于帧尺寸
+        num_frames = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
         
-        if verbose:
-            print(f"\n✓ 成功生成 ADOFAI 视频关卡!")
-            print(f"  输出文件: {output_path}")
-            print(f"  砖块数: {total_floors}")
-            print(f"  总事件数: {len(floor1_actions) + len(other_actions)}")
+        frames = _iter_video_frames(cap, size, include_alpha)
+        # 先取第一帧：一帧都解码不出来时不写出空关卡
+        first_frame = next(frames, None)
+        if first_frame is None:
+            print("错误: 未能从视频中解码出任何帧")
+            return False
+        
+        frame_events = _iter_recolor_events(chain([first_frame], frames), fps,
+                                            4 if include_alpha else 3, skip_unchanged, merge_runs)
+        _write_video_adofai_v2(frame_events, output_path, width, height, num_frames, fps, zoom, verbose)
         
         return True
         
@@ -418,6 +778,8 @@ def generate_video_adofai_v2(frame_paths, output_path, fps=None, zoom=None, verb
         import traceback
         traceback.print_exc()
         return False
+    finally:
+        cap.release()
 
 
 def main():
@@ -430,20 +792,23 @@ def main():
     parser.add_argument('--fps', type=float, default=DEFAULT_FPS, help=f'帧率（默认 {DEFAULT_FPS}）')
     parser.add_argument('--zoom', type=int, default=DEFAULT_ZOOM, help=f'缩放百分比（默认 {DEFAULT_ZOOM}）')
     parser.add_argument('--v2', action='store_true', help='使用v2 RecolorTrack方案（更高效）')
+    parser.add_argument('--alpha', action='store_true',
+                       help='颜色包含alpha通道（默认输出6位rrggbb）')
+    parser.add_argument('--full-recolor', action='store_true',
+                       help='每个像素都生成颜色事件（默认v1省略与前一砖块同色的ColorTrack，v2跳过未变化的像素并合并同色区间）')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                       help='生成事件的并行进程数（默认1，即单进程；多进程需显式指定，如 -j 4）')
     
     args = parser.parse_args()
     
-    # 处理通配符
-    frame_paths = []
-    for pattern in args.frames:
-        if '*' in pattern or '?' in pattern:
-            matched = glob.glob(pattern)
-            frame_paths.extend(sorted(matched, key=natural_sort_key))
-        else:
-            frame_paths.append(pattern)
-    
-    # 自然排序
-    frame_paths = sorted(frame_paths, key=natural_sort_key)
+    # 处理通配符（惰性展开后只做一次自然排序，每个路径只计算一次排序key）
+    frame_paths = sorted(
+        chain.from_iterable(
+            iglob_files(pattern) if '*' in pattern or '?' in pattern else (pattern,)
+            for pattern in args.frames
+        ),
+        key=natural_sort_key
+    )
     
     if not frame_paths:
         print("错误: 没有找到任何帧图片文件")
@@ -456,9 +821,16 @@ def main():
     print(f"找到 {len(frame_paths)} 个帧文件")
     
     if args.v2:
-        success = generate_video_adofai_v2(frame_paths, args.output, args.fps, args.zoom)
+        success = generate_video_adofai_v2(frame_paths, args.output, args.fps, args.zoom,
+                                           skip_unchanged=not args.full_recolor,
+                                           merge_runs=not args.full_recolor,
+                                           include_alpha=args.alpha,
+                                           workers=args.workers)
     else:
-        success = generate_video_adofai(frame_paths, args.output, args.fps, args.zoom)
+        success = generate_video_adofai(frame_paths, args.output, args.fps, args.zoom,
+                                        include_alpha=args.alpha,
+                                        skip_repeated=not args.full_recolor,
+                                        workers=args.workers)
     
     if not success:
         sys.exit(1)
@@ -8,6 +8,7 @@ import os
 import sys
 import glob
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 # 添加项目根目录到路径
@@ -33,9 +34,12 @@ from core import (
     generate_video_adofai,
     generate_video_adofai_v2
 )
-from utils import natural_sort_key, find_part_folders, find_image_files, print_progress
+from utils import natural_sort_key, find_part_folders, find_image_files, print_progress, clean_path
 from config import DEFAULT_FPS, DEFAULT_ZOOM, DEFAULT_Y_OFFSET
 
+# 输出文件默认放在脚本所在目录（启动时计算一次）
+_SCRIPT_DIR = Path(__file__).resolve().parent
+
 
 def get_input(prompt, default=None, type_=str, check=None):
     """统一输入函数"""
@@ -59,6 +63,11 @@ def get_input(prompt, default=None, type_=str, check=None):
         return val
 
 
+def get_path(prompt):
+    """输入路径（去除拖入文件时带上的引号/&符号，并展开~）"""
+    return os.path.expanduser(clean_path(get_input(prompt)))
+
+
 # ========== 1. 视频提取帧 ==========
 def menu_extract_frames():
     """视频 → 帧"""
@@ -67,19 +76,22 @@ def menu_extract_frames():
         return
     
     print("\n[视频提取帧]")
-    video = get_input("视频路径")
+    video = get_path("视频路径")
     if not os.path.exists(video):
         print("  文件不存在")
         return
     
     group = get_input("每组帧数", 1000, int, lambda x: (x > 0, "必须>0"))
-    fmt = get_input("图片格式 (png/jpg)", "png")
+    fmt = get_input("图片格式 (png/jpg)", "png",
+                    check=lambda x: (x.lower() in ('png', 'jpg', 'jpeg', 'bmp'), "只支持 png/jpg/jpeg/bmp")).lower()
+    step = get_input("每N帧取1帧", 1, int, lambda x: (x > 0, "必须>0"))
     
     result = extract_frames(
         video_path=video,
         image_format=fmt,
         group_size=group,
-        verbose=True
+        verbose=True,
+        frame_step=step
     )
     
     if not result['success']:
@@ -94,13 +106,14 @@ def menu_batch_resize():
         return
     
     print("\n[批量缩放]")
-    src = get_input("输入目录(含part*/)")
+    src = get_path("输入目录(含part*/)")
     if not os.path.isdir(src):
         print("  目录不存在")
         return
     
     w = get_input("目标宽度", 120, int, lambda x: (x > 0, "必须>0"))
     h = get_input("目标高度", 90, int, lambda x: (x > 0, "必须>0"))
+    optimize = get_input("优化压缩?(y/n)", "n").lower().startswith('y')
     
     src_p = Path(src)
     dst_p = src_p.parent / f"{src_p.name}_resized"
@@ -113,7 +126,8 @@ def menu_batch_resize():
             width=w,
             height=h,
             group_mode=True,
-            verbose=True
+            verbose=True,
+            optimize=optimize
         )
     except Exception as e:
         print(f"  错误: {e}")
@@ -123,12 +137,12 @@ def menu_batch_resize():
 def menu_image_to_adofai():
     """图片 → ADOFAI"""
     print("\n[单张图片转ADOFAI]")
-    img = get_input("图片路径")
+    img = get_path("图片路径")
     if not os.path.exists(img):
         print("  不存在")
         return
     
-    out = Path(__file__).parent / f"{Path(img).stem}.adofai"
+    out = _SCRIPT_DIR / f"{Path(img).stem}.adofai"
     y = get_input("Y偏移(行间距)", DEFAULT_Y_OFFSET, float, lambda x: (x > 0, "必须>0"))
     
     try:
@@ -138,13 +152,8 @@ def menu_image_to_adofai():
 
 
 # ========== 4. 帧文件夹 → ADOFAI ==========
-def get_frames():
+def get_frames(folder):
     """获取帧文件"""
-    folder = get_input("帧文件夹路径")
-    if not os.path.isdir(folder):
-        print("  不存在")
-        return None
-    
     files = find_image_files(folder)
     if not files:
         print("  未找到图片")
@@ -159,14 +168,20 @@ def menu_frames_to_adofai(use_v2=False):
     ver = "v2" if use_v2 else "v1"
     print(f"\n[单文件夹转ADOFAI ({ver})]")
     
-    frames = get_frames()
-    if not frames:
+    # 先完成所有输入和校验，再扫描目录
+    folder = get_path("帧文件夹路径")
+    if not os.path.isdir(folder):
+        print("  不存在")
         return
     
-    out = Path(__file__).parent / f"output_{ver}.adofai"
+    out = _SCRIPT_DIR / f"output_{ver}.adofai"
     fps = get_input("FPS", DEFAULT_FPS, float, lambda x: (x > 0, "必须>0"))
     zoom = get_input("Zoom", DEFAULT_ZOOM, int, lambda x: (x > 0, "必须>0"))
     
+    frames = get_frames(folder)
+    if not frames:
+        return
+    
     print(f"  帧数: {len(frames)}, FPS: {fps}, Zoom: {zoom}%")
     
     try:
@@ -184,7 +199,15 @@ def menu_grouped_to_adofai(use_v2=False):
     ver = "v2" if use_v2 else "v1"
     print(f"\n[分组转ADOFAI ({ver})]")
     
-    folder = get_input("输入目录(含part*/)")
+    # 先完成所有输入和校验，再扫描目录
+    folder = get_path("输入目录(含part*/)")
+    if not os.path.isdir(folder):
+        print("  目录不存在")
+        return
+    
+    fps = get_input("FPS", DEFAULT_FPS, float, lambda x: (x > 0, "必须>0"))
+    zoom = get_input("Zoom", DEFAULT_ZOOM, int, lambda x: (x > 0, "必须>0"))
+    
     parts = find_part_folders(folder)
     if not parts:
         print("  未找到part*")
@@ -193,34 +216,53 @@ def menu_grouped_to_adofai(use_v2=False):
     total_parts = len(parts)
     print(f"  找到{total_parts}个分组")
     
-    out_dir = Path(__file__).parent / f"{Path(folder).name}_levels_{ver}"
+    out_dir = _SCRIPT_DIR / f"{Path(folder).name}_levels_{ver}"
     out_dir.mkdir(parents=True, exist_ok=True)
     
-    fps = get_input("FPS", DEFAULT_FPS, float, lambda x: (x > 0, "必须>0"))
-    zoom = get_input("Zoom", DEFAULT_ZOOM, int, lambda x: (x > 0, "必须>0"))
-    
     print(f"\n开始处理 {total_parts} 个分组...\n")
     
+    generate = generate_video_adofai_v2 if use_v2 else generate_video_adofai
+    workers = min(total_parts, os.cpu_count() or 1)
+    
     ok = 0
-    for idx, (pname, frames) in enumerate(parts, 1):
-        out = out_dir / f"{pname}.adofai"
-        frame_count = len(frames)
-        
-        # 显示当前part进度
-        print(f"[{idx}/{total_parts}] {pname} ({frame_count} 帧)")
-        
-        try:
-            if use_v2:
-                generate_video_adofai_v2([str(f) for f in frames], str(out), fps, zoom, verbose=True)
-            else:
-                generate_video_adofai([str(f) for f in frames], str(out), fps, zoom, verbose=True)
-            ok += 1
-        except Exception as e:
-            print(f"  ❌ 失败: {e}")
-        
-        # 显示总体进度
-        print_progress(idx, total_parts, prefix="  总进度", suffix="")
-        print()  # 换行
+    if workers > 1:
+        # 各分组写入不同的 .adofai 文件、互不依赖，分给多个进程并行生成（生成过程是CPU密集的Python代码）
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # 分组间已经按进程并行，workers=1 使每个分组内部不再另开进程池
+            futures = {
+                pool.submit(generate, [str(f) for f in frames], str(out_dir / f"{pname}.adofai"),
+                            fps, zoom, verbose=False, workers=1): (pname, len(frames))
+                for pname, frames in parts
+            }
+            for idx, future in enumerate(as_completed(futures), 1):
+                pname, frame_count = futures[future]
+                try:
+                    success = future.result()
+                except Exception as e:
+                    success = False
+                    print(f"  ❌ {pname} 失败: {e}")
+                if success:
+                    ok += 1
+                    print(f"[{idx}/{total_parts}] ✅ {pname} ({frame_count} 帧)")
+                else:
+                    print(f"[{idx}/{total_parts}] ❌ {pname} ({frame_count} 帧)")
+    else:
+        for idx, (pname, frames) in enumerate(parts, 1):
+            out = out_dir / f"{pname}.adofai"
+            frame_count = len(frames)
+            
+            # 显示当前part进度
+            print(f"[{idx}/{total_parts}] {pname} ({frame_count} 帧)")
+            
+            try:
+                if generate([str(f) for f in frames], str(out), fps, zoom, verbose=True):
+                    ok += 1
+            except Exception as e:
+                print(f"  ❌ 失败: {e}")
+            
+            # 显示总体进度
+            print_progress(idx, total_parts, prefix="  总进度", suffix="")
+            print()  # 换行
     
     print(f"\n{'='*50}")
     print(f"完成: {ok}/{total_parts} 个分组成功")
@@ -230,6 +272,12 @@ def menu_grouped_to_adofai(use_v2=False):
 
 # ========== 主菜单 ==========
 def main():
+    # 带参数运行时（如 python main.py extract video.mp4）直接走命令行入口，不进入交互菜单
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        cli_main()
+        return
+    
     print("=" * 50)
     print("  ADOFAI 工具集")
     print("  将图片或视频转换成ADOFAI关卡文件")
@@ -7,22 +7,65 @@ ADOFAI 工具集 - 公共工具函数
 import re
 import os
 import sys
-from pathlib import Path
+import json
+import glob
+import time
+import fnmatch
+from functools import lru_cache
 
 
+# 自然排序用的数字分段正则（模块加载时编译一次）
+_NUM_RE = re.compile(r'([0-9]+)')
+
+# part分组目录名正则
+_PART_RE = re.compile(r'^part\d+$', re.IGNORECASE)
+
+# 默认识别的图片扩展名（小写）
+_IMAGE_EXTS = frozenset({'.png', '.jpg', '.jpeg'})
+
+# 0-255 对应的两位十六进制字符串
+_HEX_LUT = tuple(f"{i:02x}" for i in range(256))
+
+
+@lru_cache(maxsize=65536)
 def natural_sort_key(s):
     """
     自然排序key函数，将数字部分转为整数比较
     用于正确排序: 1.png, 2.png, ..., 10.png, 11.png
+    （结果按输入缓存，同一批文件名在菜单中被反复排序时不再重复切分）
     
     参数:
         s: 字符串或Path对象
     
     返回:
-        list: 排序用的key列表
+        tuple: 排序用的key元组（比列表比较更快，且可哈希）
     """
-    return [int(text) if text.isdigit() else text.lower()
-            for text in re.split('([0-9]+)', str(s))]
+    # 带捕获组的split结果中，奇数下标恰好是数字段
+    return tuple(int(text) if i & 1 else text.lower()
+                 for i, text in enumerate(_NUM_RE.split(str(s))))
+
+
+def _format_bool(val):
+    return "true" if val else "false"
+
+
+def _format_str(val):
+    # 使用json模块（C实现）转义字符串，保证引号、反斜杠等字符输出合法
+    return json.dumps(val, ensure_ascii=False)
+
+
+def _format_list(val):
+    return f'[{", ".join(map(format_value, val))}]'
+
+
+# 按精确类型分派的格式化函数（bool在int之前，子类按此顺序用isinstance回退匹配）
+_FORMATTERS = {
+    bool: _format_bool,
+    int: str,
+    float: str,
+    str: _format_str,
+    list: _format_list,
+}
 
 
 def format_value(val):
@@ -35,18 +78,15 @@ def format_value(val):
     返回:
         str: 格式化后的字符串
     """
-    if isinstance(val, bool):
-        return "true" if val else "false"
-    elif isinstance(val, int):
-        return str(val)
-    elif isinstance(val, float):
-        return str(val)
-    elif isinstance(val, str):
-        return f'"{val}"'
-    elif isinstance(val, list):
-        items = [format_value(v) for v in val]
-        return f'[{", ".join(items)}]'
-    return str(val)
+    formatter = _FORMATTERS.get(type(val))
+    if formatter is None:
+        for base, base_formatter in _FORMATTERS.items():
+            if isinstance(val, base):
+                formatter = base_formatter
+                break
+        else:
+            formatter = str
+    return formatter(val)
 
 
 def clean_path(path):
@@ -107,7 +147,100 @@ def pixel_to_hex(r, g, b, a=255):
     返回:
         str: 十六进制颜色字符串（如 "ff0000ff"）
     """
-    return f"{r:02x}{g:02x}{b:02x}{a:02x}"
+    return _HEX_LUT[r] + _HEX_LUT[g] + _HEX_LUT[b] + _HEX_LUT[a]
+
+
+def image_to_hex_colors(img):
+    """
+    将整张图片的像素一次性转换为十六进制颜色字符串
+    （一次 bytes.hex() 完成全部转换，代替逐像素调用 pixel_to_hex）
+    
+    参数:
+        img: RGBA或RGB模式的PIL图片
+    
+    返回:
+        list: 按行优先顺序排列的颜色字符串列表（RGBA为"ff0000ff"，RGB为"ff0000"）
+    """
+    return bytes_to_hex_colors(img.tobytes(), len(img.getbands()))
+
+
+def bytes_to_hex_colors(data, channels=4):
+    """
+    将原始像素字节转换为十六进制颜色字符串列表
+    
+    参数:
+        data: 像素字节（如 img.tobytes() 的结果）
+        channels: 每像素字节数（4=RGBA输出"rrggbbaa"，3=RGB输出"rrggbb"）
+    
+    返回:
+        list: 颜色字符串列表（如 "ff0000ff"）
+    """
+    hex_data = data.hex()
+    step = channels * 2
+    return [hex_data[i:i + step] for i in range(0, len(hex_data), step)]
+
+
+def scan_image_files(folder_path, extensions=None):
+    """
+    单次 os.scandir 遍历目录，按扩展名（不区分大小写）筛选图片文件
+    
+    参数:
+        folder_path: 目录路径
+        extensions: 扩展名列表（默认 ['.png', '.jpg', '.jpeg']）
+    
+    返回:
+        list: 图片文件路径字符串列表（按自然排序）
+    """
+    if extensions is None:
+        exts = _IMAGE_EXTS
+    else:
+        exts = frozenset(ext.lower() for ext in extensions)
+    
+    with os.scandir(folder_path) as entries:
+        # 与glob一致跳过以"."开头的隐藏文件（如macOS的 ._0001.png 资源分支文件）
+        found = [(os.path.splitext(entry.name), entry.path) for entry in entries
+                 if not entry.name.startswith('.') and entry.is_file()]
+    found = [(stem, ext.lower(), path) for (stem, ext), path in found if ext.lower() in exts]
+    
+    if all(stem.isascii() and stem.isdigit() for stem, _, _ in found):
+        # 提取帧输出的纯数字文件名（1.png, 2.png, ...）直接按整数排序，结果与自然排序一致
+        found.sort(key=lambda item: (int(item[0]), item[1]))
+        files = [path for _, _, path in found]
+    else:
+        files = sorted((path for _, _, path in found), key=natural_sort_key)
+    return files
+
+
+def iglob_files(pattern):
+    """
+    展开通配符路径（如 frames/*.png），结果与 glob.iglob 相同
+    目录部分不含通配符时只对该目录做一次 os.scandir，用预编译的正则匹配文件名，不做额外的stat调用
+    
+    参数:
+        pattern: 通配符路径
+    
+    返回:
+        生成器，产出匹配的路径字符串（顺序不定，需要时由调用方排序）
+    """
+    dirname, basename = os.path.split(pattern)
+    if any(c in dirname for c in '*?['):
+        yield from glob.iglob(pattern)
+        return
+    
+    name_re = re.compile(fnmatch.translate(os.path.normcase(basename)))
+    # 与glob一致：通配符不匹配以"."开头的隐藏文件，除非模式本身以"."开头
+    match_hidden = basename.startswith('.')
+    try:
+        with os.scandir(dirname or os.curdir) as entries:
+            names = [entry.name for entry in entries]
+    except OSError:
+        return
+    
+    for name in names:
+        if name.startswith('.') and not match_hidden:
+            continue
+        if name_re.match(os.path.normcase(name)):
+            yield os.path.join(dirname, name)
 
 
 def find_part_folders(folder_path):
@@ -118,21 +251,18 @@ def find_part_folders(folder_path):
         folder_path: 文件夹路径
     
     返回:
-        list: [(文件夹名, 文件列表), ...] 按自然排序
+        list: [(文件夹名, 文件路径列表), ...] 按自然排序
     """
-    p = Path(folder_path)
-    if not p.is_dir():
+    if not os.path.isdir(folder_path):
         return None
     
     parts = []
-    for item in p.iterdir():
-        if item.is_dir() and re.match(r'^part\d+$', item.name, re.IGNORECASE):
-            files = []
-            for ext in ['*.png', '*.jpg', '*.jpeg']:
-                files.extend(item.glob(ext))
-                files.extend(item.glob(ext.upper()))
-            if files:
-                parts.append((item.name, sorted(files, key=natural_sort_key)))
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.is_dir() and _PART_RE.match(entry.name):
+                files = scan_image_files(entry.path)
+                if files:
+                    parts.append((entry.name, files))
     
     if not parts:
         return None
@@ -150,24 +280,16 @@ def find_image_files(folder_path, extensions=None):
         extensions: 扩展名列表（默认 ['.png', '.jpg', '.jpeg']）
     
     返回:
-        list: 图片文件路径列表（按自然排序）
+        list: 图片文件路径字符串列表（按自然排序）
     """
-    if extensions is None:
-        extensions = ['.png', '.jpg', '.jpeg']
-    
-    p = Path(folder_path)
-    if not p.is_dir():
+    if not os.path.isdir(folder_path):
         return None
     
-    files = []
-    for ext in extensions:
-        files.extend(p.glob(f"*{ext}"))
-        files.extend(p.glob(f"*{ext.upper()}"))
-    
+    files = scan_image_files(folder_path, extensions)
     if not files:
         return None
     
-    return sorted(files, key=natural_sort_key)
+    return files
 
 
 def format_file_size(size_bytes):
@@ -179,9 +301,14 @@ def format_file_size(size_bytes):
     return f"{size_bytes:.1f}TB"
 
 
-def print_progress(current, total, prefix="", suffix="", bar_width=40, refresh_percent=5):
+# 各进度条（按prefix区分）上次刷新的时间，用于限制终端刷新频率；
+# 嵌套或交替刷新的进度条互不影响，进度条完成时移除
+_last_progress_times = {}
+
+
+def print_progress(current, total, prefix="", suffix="", bar_width=40, refresh_percent=5, min_interval=0.1):
     """
-    打印进度条（每refresh_percent%刷新一次）
+    打印进度条（每refresh_percent%刷新一次，且两次刷新至少间隔min_interval秒）
     
     参数:
         current: 当前进度
@@ -190,6 +317,7 @@ def print_progress(current, total, prefix="", suffix="", bar_width=40, refresh_p
         suffix: 后缀文字
         bar_width: 进度条宽度
         refresh_percent: 刷新百分比（默认5%）
+        min_interval: 最小刷新间隔秒数（按prefix分别计算，完成时总会刷新）
     """
     if total == 0:
         return
@@ -202,6 +330,14 @@ def print_progress(current, total, prefix="", suffix="", bar_width=40, refresh_p
     
     # 只在达到新的检查点或完成时刷新
     if checkpoint > prev_checkpoint or current == total:
+        now = time.monotonic()
+        if current == total:
+            _last_progress_times.pop(prefix, None)
+        elif now - _last_progress_times.get(prefix, 0.0) < min_interval:
+            return
+        else:
+            _last_progress_times[prefix] = now
+        
         filled = int(bar_width * current / total)
         bar = "█" * filled + "░" * (bar_width - filled)
         